@@ -0,0 +1,48 @@
+"""
+Database performance profile: SQLite pragmas applied to every new connection,
+and an optional read replica for the heavy analytics and export reads.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver applying SQLITE_PRAGMAS to new SQLite connections.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_read_alias():
+    """
+    Return the database alias for analytics and export reads: the configured
+    replica when there is one, otherwise the default database.
+    """
+    replica = settings.DATABASE_READ_REPLICA
+    if replica and replica in connections.settings:
+        return replica
+    return 'default'
+
+
+class ReplicaRouter:
+    """
+    Keeps writes, migrations and unpinned reads on the default database. Reads are sent
+    to the replica only by querysets that ask for get_read_alias().
+    """
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the default database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != settings.DATABASE_READ_REPLICA
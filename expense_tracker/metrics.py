@@ -0,0 +1,187 @@
+"""
+In-process request metrics: per-request timings collected by
+RequestMetricsMiddleware, a rolling store of recent requests per view, and an
+admin-only endpoint rendering the store in the Prometheus text format.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from expenses.services.cache import AnalyticsCache
+
+
+slow_query_logger = logging.getLogger('expense_tracker.slow_queries')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Timings of one request. Database time is collected by the execute wrapper,
+    other phases through the profile() hook.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        connection.execute_wrapper hook counting and timing every query.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            threshold = settings.METRICS_SLOW_QUERY_MS
+            if threshold is not None and duration * 1000 >= threshold:
+                slow_query_logger.warning(
+                    "Slow query (%.1f ms) on %s: %s", duration * 1000, context['connection'].alias, sql
+                )
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Render the timings as a Server-Timing header value.
+        """
+        entries = [
+            f'total;dur={self.elapsed * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        entries.extend(f'{name};dur={duration * 1000:.1f}' for name, duration in self.timings.items())
+        return ', '.join(entries)
+
+
+@contextmanager
+def profile(name):
+    """
+    Add the time spent in the block to the current request's `name` timing.
+    Outside a request this does nothing.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+
+
+class MetricsStore:
+    """
+    Totals per (view, method, status) since the process started, plus the latencies
+    of the last METRICS_WINDOW requests per view for quantiles.
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    _lock = threading.Lock()
+    _totals = {}
+    _latencies = {}
+
+    @staticmethod
+    def record(view, method, status, metrics, response_size):
+        key = (view, method, str(status))
+        elapsed = metrics.elapsed
+        with MetricsStore._lock:
+            totals = MetricsStore._totals.setdefault(key, defaultdict(float))
+            totals['requests'] += 1
+            totals['seconds'] += elapsed
+            totals['db_queries'] += metrics.queries
+            totals['db_seconds'] += metrics.db_time
+            totals['response_bytes'] += response_size
+            for name, duration in metrics.timings.items():
+                totals[f'{name}_seconds'] += duration
+            window = MetricsStore._latencies.setdefault(view, deque(maxlen=settings.METRICS_WINDOW))
+            window.append(elapsed)
+
+    @staticmethod
+    def snapshot():
+        with MetricsStore._lock:
+            totals = {key: dict(values) for key, values in MetricsStore._totals.items()}
+            latencies = {view: sorted(window) for view, window in MetricsStore._latencies.items()}
+        return totals, latencies
+
+    @staticmethod
+    def reset():
+        with MetricsStore._lock:
+            MetricsStore._totals.clear()
+            MetricsStore._latencies.clear()
+
+    @staticmethod
+    def render_prometheus():
+        """
+        Render the store in the Prometheus text exposition format.
+        """
+        totals, latencies = MetricsStore.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value:g}')
+
+        def counter(name, field, help_text):
+            family(name, 'counter', help_text, [
+                ({'view': view, 'method': method, 'status': status}, values[field])
+                for (view, method, status), values in sorted(totals.items()) if field in values
+            ])
+
+        counter('http_requests_total', 'requests', 'Requests handled.')
+        counter('http_request_duration_seconds_total', 'seconds', 'Time spent handling requests.')
+        counter('http_request_db_queries_total', 'db_queries', 'Database queries run by requests.')
+        counter('http_request_db_duration_seconds_total', 'db_seconds', 'Time spent in database queries.')
+        counter('http_response_size_bytes_total', 'response_bytes', 'Response body bytes sent.')
+        counter('http_request_serialize_seconds_total', 'serialize_seconds', 'Time spent serializing data.')
+        counter('http_request_render_seconds_total', 'render_seconds', 'Time spent rendering responses.')
+
+        family('http_request_latency_seconds', 'summary', 'Latency over the most recent requests.', [
+            ({'view': view, 'quantile': str(quantile)}, window[min(len(window) - 1, int(len(window) * quantile))])
+            for view, window in sorted(latencies.items())
+            for quantile in MetricsStore.QUANTILES
+        ])
+        for view, window in sorted(latencies.items()):
+            lines.append(f'http_request_latency_seconds_sum{{view="{escape(view)}"}} {sum(window):g}')
+            lines.append(f'http_request_latency_seconds_count{{view="{escape(view)}"}} {len(window)}')
+
+        cache_stats = AnalyticsCache.get_stats()
+        family('analytics_cache_requests_total', 'counter', 'Analytics cache lookups.', [
+            ({'result': 'hit'}, cache_stats['hits']),
+            ({'result': 'miss'}, cache_stats['misses']),
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Expose the request metrics of this process to Prometheus. Admins only.
+        """
+        if request.user.role != 'admin':
+            return Response({"error": "Only admins can read metrics."}, status=403)
+        return HttpResponse(MetricsStore.render_prometheus(), content_type='text/plain; version=0.0.4')
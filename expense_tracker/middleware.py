@@ -0,0 +1,189 @@
+import gzip
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from expense_tracker.metrics import MetricsStore, RequestMetrics, current_metrics, profile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count, database time, serialization and render time and
+    response size of every request. The timings go out in a Server-Timing header
+    and into MetricsStore, served at /metrics. Runs sync or async to match the
+    handler, so async views keep their event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with self.capture_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        # The ORM runs on sync_to_async threads here, whose connections the execute
+        # wrapper does not see, so async requests report latency and size but no queries
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        view = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        response['Server-Timing'] = metrics.server_timing()
+        if not response.streaming:
+            MetricsStore.record(view, request.method, response.status_code, metrics, len(response.content))
+        elif isinstance(response, FileResponse):
+            # Leave the body alone so servers can still send the file directly
+            size = int(response.get('Content-Length') or 0)
+            MetricsStore.record(view, request.method, response.status_code, metrics, size)
+        elif response.is_async:
+            response.streaming_content = self.measure_async_stream(
+                response.streaming_content, view, request.method, response, metrics
+            )
+        else:
+            # The body, and its queries, are produced after this returns, so the header
+            # only covers the time to the first byte while the store gets the full request
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, view, request.method, response, metrics
+            )
+        return response
+
+    @staticmethod
+    def capture_queries(metrics):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics))
+        return stack
+
+    def process_template_response(self, request, response):
+        """
+        Time DRF rendering, which runs after the view returns.
+        """
+        metrics = current_metrics.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def finish_render(rendered):
+                metrics.timings['render'] += time.perf_counter() - started
+
+            response.add_post_render_callback(finish_render)
+        return response
+
+    def measure_stream(self, content, view, method, response, metrics):
+        size = 0
+        with self.capture_queries(metrics):
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        MetricsStore.record(view, method, response.status_code, metrics, size)
+
+    async def measure_async_stream(self, content, view, method, response, metrics):
+        # Async ORM queries run on another thread, outside the execute wrapper
+        size = 0
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+        MetricsStore.record(view, method, response.status_code, metrics, size)
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies of at least COMPRESSION_MIN_SIZE bytes, with brotli when
+    it is installed and the client accepts it, otherwise gzip. Streaming responses,
+    such as exports, are left alone; they choose their own encoding.
+    Runs sync or async to match the handler, so async views keep their event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if not settings.COMPRESSION_ENABLED or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if not content_type.startswith(settings.COMPRESSION_CONTENT_TYPES):
+            return response
+
+        # Whether the body is compressed depends on the request's Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        with profile('compress'):
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The encoded bytes differ from the identity ones, so a strong ETag no longer holds
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def choose_encoding(accept_encoding):
+        if brotli is not None and re_accepts_br.search(accept_encoding):
+            return 'br'
+        if re_accepts_gzip.search(accept_encoding):
+            return 'gzip'
+        return None
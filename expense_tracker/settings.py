@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expense_tracker.middleware.RequestMetricsMiddleware',
+    'expense_tracker.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,9 +82,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests instead of reconnecting each time
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers wait
+            # for it (up to busy_timeout) instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+DATABASE_ROUTERS = ['expense_tracker.db.ReplicaRouter']
+
+# Pragmas run on every new SQLite connection (expense_tracker.db.configure_sqlite).
+# WAL lets readers run alongside the writer, NORMAL sync only fsyncs at checkpoints,
+# and writers wait up to busy_timeout milliseconds for the lock. An empty dict keeps
+# the SQLite defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Alias in DATABASES of a read replica serving the analytics and export reads, or
+# None to read everything from the default database. The replica may lag behind, so
+# analytics computed right after a write can be briefly stale.
+DATABASE_READ_REPLICA = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,12 +158,169 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # Number of items per page
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # orjson when installed, with DRF's json module as the fallback
+    'DEFAULT_RENDERER_CLASSES': [
+        'expense_tracker.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'expense_tracker.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Tokens carry the username and role so requests skip the user query
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.token.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.token.ClaimsTokenRefreshSerializer',
 }
 
+# Seconds a user record loaded for authentication is reused in this process.
+USER_CACHE_TTL = 60
+
+# Expense sync
+# Days a /expenses/changes/ sync token stays valid. Change log entries older than
+# this are deleted by `python manage.py purge_expense_changes`.
+EXPENSE_SYNC_RETENTION_DAYS = 30
 
+# Expense list pagination
+# Clients pick a mode with ?pagination=page|cursor (a ?cursor= parameter implies
+# cursor mode) and a page size with ?page_size=, capped at PAGINATION_MAX_PAGE_SIZE.
+EXPENSE_LIST_PAGINATION = 'page'
+PAGINATION_MAX_PAGE_SIZE = 100
 
+# Default ?category= matching for the expense list when no ?category_match= is
+# given: 'contains' (substring, a scan) keeps the original behaviour; clients opt in
+# to 'exact' and 'prefix', which use the normalized category index.
+EXPENSE_CATEGORY_MATCH = 'contains'
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Analytics payloads are cached per user (and once for admins) in this cache
+# alias. Bump the version whenever the payload format changes.
+ANALYTICS_CACHE_ALIAS = 'default'
+ANALYTICS_CACHE_TIMEOUT = 300
+ANALYTICS_CACHE_VERSION = 1
+# Cache alias holding the per-user expense versions behind the list, detail and
+# analytics ETags. It must be shared by every process serving requests (`check
+# --deploy` warns about LocMemCache); versions expire after EXPENSE_VERSION_TIMEOUT
+# seconds, which bounds how long a process that missed a write can answer 304.
+EXPENSE_VERSION_CACHE_ALIAS = 'default'
+EXPENSE_VERSION_TIMEOUT = 3600
+
+# Maximum number of periods one /analytics/timeseries/ response may cover.
+TIMESERIES_MAX_POINTS = 1000
+
+# Admin dashboards
+# Seconds the materialized admin dashboards may lag behind the expenses before a
+# request refreshes them inline (see also `manage.py refresh_admin_dashboards`).
+ADMIN_DASHBOARD_MAX_STALENESS = 300
+# Number of users and of expenses in the dashboard top lists.
+ADMIN_DASHBOARD_TOP_N = 10
+# Seconds before each refresh that the next one looks back over, so writes that
+# committed while a refresh ran are not missed.
+ADMIN_DASHBOARD_REFRESH_OVERLAP = 60
+
+# Request metrics
+# Time every request (Server-Timing header and the admin-only /metrics endpoint).
+METRICS_ENABLED = True
+# Number of recent requests per view kept for the latency quantiles.
+METRICS_WINDOW = 1000
+# Log queries slower than this many milliseconds to the expense_tracker.slow_queries
+# logger. None turns slow query logging off.
+METRICS_SLOW_QUERY_MS = 200
+
+# Response compression
+# Compress responses with brotli (when installed) or gzip for clients that accept it.
+COMPRESSION_ENABLED = True
+# Bodies smaller than this many bytes are sent uncompressed.
+COMPRESSION_MIN_SIZE = 1024
+# Content types that are compressed (prefix match).
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/')
+# Compression level for gzip (1 fastest - 9 smallest).
+COMPRESSION_GZIP_LEVEL = 6
+# Compression quality for brotli (0 fastest - 11 smallest).
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Expense export
+# Stream CSV exports row by row instead of building them in memory. Clients can
+# override this per request with ?stream=true|false.
+EXPORT_STREAMING = True
+# Number of rows fetched from the database per round trip while streaming.
+EXPORT_CHUNK_SIZE = 2000
+# Format used when ?format= is not given: csv, csv.gz, jsonl, and arrow and
+# parquet when pyarrow is installed.
+EXPORT_DEFAULT_FORMAT = 'csv'
+# Compression level for csv.gz exports (1 fastest - 9 smallest).
+EXPORT_GZIP_LEVEL = 6
+# Bytes of CSV gathered before each compressed chunk is sent.
+EXPORT_COMPRESS_CHUNK_SIZE = 64 * 1024
+# Parquet column compression codec.
+EXPORT_PARQUET_COMPRESSION = 'zstd'
+
+# Expense archive
+# Expenses dated more than this many days ago may be moved to the archive table by
+# `python manage.py archive_expenses`; date range reads that reach back further also
+# query the archive. None keeps every expense in the hot table. Once expenses have been
+# archived, only raise this value, never unset it.
+EXPENSE_ARCHIVE_AFTER_DAYS = None
+# Number of expenses moved per transaction.
+EXPENSE_ARCHIVE_BATCH_SIZE = 5000
+
+# Background export jobs
+# Directory the finished export files are written to.
+EXPORT_JOB_DIR = BASE_DIR / 'exports'
+# Run a worker thread pool inside the web process. Turn this off when jobs are
+# processed by `python manage.py run_export_worker` instead.
+EXPORT_JOB_IN_PROCESS = True
+# Number of worker threads in the in-process pool.
+EXPORT_JOB_WORKERS = 2
+# Seconds run_export_worker waits before polling an empty queue again.
+EXPORT_JOB_POLL_INTERVAL = 2
+# Seconds after which a running job is assumed to belong to a worker that crashed or
+# restarted, and is requeued by the next worker looking for work. Keep it well above
+# the longest export, or a slow job will be run twice.
+EXPORT_JOB_TIMEOUT = 3600
+
+# Bulk expense endpoints
+# Maximum number of items accepted in one bulk request.
+BULK_MAX_ITEMS = 10000
+# Number of rows written per INSERT/UPDATE statement.
+BULK_BATCH_SIZE = 500
+
+# Expense import
+# Number of rows committed per transaction (and per checkpoint).
+IMPORT_BATCH_SIZE = 1000
+# Category given to imported rows that have none and match no keyword.
+IMPORT_DEFAULT_CATEGORY = 'Uncategorized'
+# Source category names renamed on import (case-insensitive).
+IMPORT_CATEGORY_ALIASES = {
+    'groceries': 'Food',
+    'restaurants': 'Food',
+    'transport': 'Travel',
+    'transportation': 'Travel',
+}
+# Title keywords used to pick a category when the row has none (case-insensitive).
+IMPORT_CATEGORY_KEYWORDS = {
+    'grocery': 'Food',
+    'restaurant': 'Food',
+    'uber': 'Travel',
+    'airline': 'Travel',
+    'rent': 'Rent',
+    'pharmacy': 'Health',
+}
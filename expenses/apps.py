@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.core.checks import Tags, register
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def prepare_database(sender, using, **kwargs):
+    """
+    Set up the search index and backfill derived columns after migrations.
+    """
+    from expenses.repositories.expense import ExpenseRepository
+    from expenses.repositories.search import ExpenseSearchRepository
+
+    ExpenseSearchRepository.install(connections[using])
+    ExpenseRepository.backfill_normalized_categories(using=using)
 
 
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
+
+    def ready(self):
+        from expense_tracker.db import configure_sqlite
+        from expenses.checks import check_version_cache
+
+        # Only under `check --deploy`: a single-process development server is fine
+        register(check_version_cache, Tags.caches, deploy=True)
+        post_migrate.connect(prepare_database, sender=self)
+        connection_created.connect(configure_sqlite)
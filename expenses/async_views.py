@@ -0,0 +1,139 @@
+"""
+Async variants of the expense endpoints, for deployments served through ASGI.
+
+Reads use Django's async ORM, so a slow list, export or analytics request does
+not hold a worker thread while it waits on the database. Writes still go
+through ExpenseService in a thread, because they run inside transactions,
+which the async ORM does not support.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.utils.encoders import JSONEncoder
+
+from expenses.filters.expense import ExpenseFilter
+from expenses.models import Expense
+from expenses.pagination import ExpenseKeysetPagination
+from expenses.repositories.expense import ExpenseRepository
+from expenses.serializers.expense import ExpenseCreateSerializer, ExpenseReadSerializer, ExpenseSerializer
+from expenses.services.expense import ExpenseService
+from users.authentication import ClaimsJWTAuthentication
+
+
+def api_response(data, status=200):
+    # DRF's encoder keeps Decimal and date rendering identical to the sync endpoints
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def async_authenticated(view):
+    """
+    Authenticate the request with the JWT access token before running the async view.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            return api_response({"detail": str(e.detail)}, status=401)
+        if result is None:
+            return api_response({"detail": "Authentication credentials were not provided."}, status=401)
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+
+@async_authenticated
+@require_http_methods(['GET', 'POST'])
+async def expense_list(request):
+    """
+    List expenses with keyset pagination, or create one.
+    """
+    if request.method == 'POST':
+        return await create_expense(request)
+
+    queryset = ExpenseService.get_expenses(request.user)
+    filterset = ExpenseFilter(request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        return api_response(filterset.errors, status=400)
+
+    pagination = ExpenseKeysetPagination()
+    pagination.request = request
+    page_size = pagination.get_page_size(request.GET)
+    try:
+        position = pagination.decode_cursor(request.GET.get(pagination.cursor_query_param))
+    except NotFound as e:
+        return api_response({"detail": str(e.detail)}, status=404)
+
+    serializer = ExpenseReadSerializer(request)
+    rows = pagination.apply_position(filterset.qs, position).values(*serializer.source_fields)
+    page = pagination.finish_page([row async for row in rows[:page_size + 1]], page_size)
+    return api_response({
+        "next": pagination.get_next_link(),
+        "results": serializer.serialize_many(page),
+    })
+
+
+async def create_expense(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return api_response({"detail": "Invalid JSON body."}, status=400)
+    serializer = ExpenseCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return api_response(serializer.errors, status=400)
+    expense = await sync_to_async(ExpenseService.create_expense)(serializer.validated_data, request.user)
+    return api_response(ExpenseCreateSerializer(expense).data, status=201)
+
+
+@async_authenticated
+@require_GET
+async def expense_detail(request, id):
+    """
+    Retrieve an expense by ID.
+    """
+    query = Expense.objects.only(*ExpenseRepository.DETAIL_FIELDS)
+    if request.user.role != 'admin':
+        query = query.filter(user=request.user)
+    try:
+        expense = await query.aget(id=id)
+    except Expense.DoesNotExist:
+        return api_response({"detail": "No Expense matches the given query."}, status=404)
+    return api_response(ExpenseSerializer(expense, context={'request': request}).data)
+
+
+@async_authenticated
+@require_GET
+async def export_expenses(request):
+    """
+    Stream the CSV export with the async ORM.
+    """
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    try:
+        ExpenseService.validate_date_range(start_date, end_date)
+    except ValueError as e:
+        return api_response({"error": str(e)}, status=400)
+
+    admin = request.user.role == 'admin'
+    expenses = ExpenseService.get_expenses_for_export(start_date, end_date, request.user, admin)
+    response = StreamingHttpResponse(
+        ExpenseService.astream_csv(expenses, include_user=admin), content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="expenses_{start_date}_to_{end_date}.csv"'
+    return response
+
+
+@async_authenticated
+@require_GET
+async def expense_analytics(request):
+    """
+    Analytics payload, read through the async cache and ORM; cache hits return
+    without touching the database.
+    """
+    analytics = await ExpenseService.agenerate_analytics(request.user)
+    return api_response(analytics)
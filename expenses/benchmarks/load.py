@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+
+
+def endpoint_paths(expense_id, days=90):
+    """
+    Return {name: (sync path, async path)} for the endpoints under test.
+    """
+    end = date.today()
+    start = end - timedelta(days=days)
+    export_query = f'?start_date={start.isoformat()}&end_date={end.isoformat()}'
+    return {
+        'list': ('/api/expenses/?pagination=cursor&page_size=50', '/api/async/expenses/?page_size=50'),
+        'detail': (f'/api/expenses/{expense_id}/', f'/api/async/expenses/{expense_id}/'),
+        'analytics': ('/api/analytics/', '/api/async/analytics/'),
+        'export': (f'/api/expenses/export/{export_query}', f'/api/async/expenses/export/{export_query}'),
+    }
+
+
+def summarize(latencies, elapsed, errors):
+    """
+    Return requests/sec and latency percentiles (in ms) for one run.
+    """
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(0.50),
+        'p99': percentile(0.99),
+    }
+
+
+def run_wsgi(path, token, requests, concurrency):
+    """
+    Issue `requests` GETs through the WSGI handler from `concurrency` threads.
+    """
+    local = threading.local()
+    errors = []
+
+    def fetch(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        started = time.perf_counter()
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        latency = time.perf_counter() - started
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        return latency
+
+    def finish(_):
+        close_old_connections()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(fetch, range(requests)))
+        # Each worker thread opened its own database connection
+        list(executor.map(finish, range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+async def run_asgi(path, token, requests, concurrency):
+    """
+    Issue `requests` GETs through the ASGI handler with at most `concurrency` in flight.
+    """
+    # Defaults are ASGI header names here, not WSGI environ keys
+    client = AsyncClient(AUTHORIZATION=f'Bearer {token}')
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = []
+
+    async def fetch():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            if response.streaming:
+                [chunk async for chunk in response.streaming_content]
+            latency = time.perf_counter() - started
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            return latency
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(fetch() for _ in range(requests)))
+    return summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+def compare_handlers(paths, token, requests, concurrency):
+    """
+    Yield (endpoint, WSGI summary, ASGI summary) for each endpoint.
+    """
+    for name, (sync_path, async_path) in paths.items():
+        wsgi = run_wsgi(sync_path, token, requests, concurrency)
+        asgi = asyncio.run(run_asgi(async_path, token, requests, concurrency))
+        yield name, wsgi, asgi
@@ -0,0 +1,64 @@
+import time
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from expenses.repositories.expense import ExpenseRepository
+
+
+def repository_cases(user, admin=False):
+    """
+    Return (name, callable) pairs exercising each ExpenseRepository read method.
+    """
+    today = date.today()
+    last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+    start_date = today - timedelta(days=90)
+    return [
+        ('get_expenses_by_date_range', lambda: list(
+            ExpenseRepository.get_expenses_by_date_range(start_date, today, user=user, admin=admin))),
+        ('get_export_rows', lambda: list(
+            ExpenseRepository.get_export_rows(start_date, today, user=user, admin=admin))),
+        ('get_expenses_by_category', lambda: list(
+            ExpenseRepository.get_expenses_by_category(user=user, admin=admin))),
+        ('get_monthly_totals', lambda: list(
+            ExpenseRepository.get_monthly_totals(today.year, user=user, admin=admin))),
+        ('get_weekly_trends', lambda: list(
+            ExpenseRepository.get_weekly_trends(last_month, user=user, admin=admin))),
+        ('get_highest_spending_category', lambda: ExpenseRepository.get_highest_spending_category(
+            user=user, admin=admin)),
+        ('get_highest_single_expense', lambda: ExpenseRepository.get_highest_single_expense(
+            user=user, admin=admin)),
+    ]
+
+
+def explain(sql, tag=''):
+    """
+    Return the query plan of an already executed SQL statement as text lines.
+    """
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        # SQLite does not re-plan a cached EXPLAIN after a schema change, so the
+        # statement text is tagged per benchmark phase to force a fresh plan.
+        cursor.execute(f'{prefix}{sql} /* {tag} */')
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [' '.join(str(col) for col in row) for row in rows]
+
+
+def measure(func, repeat=5, tag=''):
+    """
+    Run `func` `repeat` times and return (best seconds, plans of the queries it ran).
+    """
+    with CaptureQueriesContext(connection) as captured:
+        func()
+    plans = [explain(query['sql'], tag) for query in captured.captured_queries]
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), plans
@@ -0,0 +1,44 @@
+import gzip
+from types import SimpleNamespace
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from expense_tracker.middleware import brotli
+from expense_tracker.renderers import FastJSONRenderer
+from expenses.benchmarks.serialization import build_rows, throughput
+from expenses.serializers.expense import ExpenseReadSerializer
+
+
+def build_payload(count, role='regular'):
+    """
+    Build a list response body of `count` serialized expenses, as the list endpoint returns it.
+    """
+    request = SimpleNamespace(user=SimpleNamespace(role=role))
+    _, rows = build_rows(count)
+    return {'next': None, 'previous': None, 'results': ExpenseReadSerializer(request).serialize_many(rows)}
+
+
+def compare_renderers(count, role='regular', repeat=3):
+    """
+    Return (JSONRenderer rows/sec, FastJSONRenderer rows/sec) for a payload of `count` rows.
+    FastJSONRenderer is only faster when orjson is installed.
+    """
+    payload = build_payload(count, role)
+    stdlib = throughput(lambda: JSONRenderer().render(payload), count, repeat)
+    fast = throughput(lambda: FastJSONRenderer().render(payload), count, repeat)
+    return stdlib, fast
+
+
+def compare_encodings(count, role='regular'):
+    """
+    Return the rendered body size in bytes for each content encoding the
+    compression middleware can send. brotli is None when it is not installed.
+    """
+    body = FastJSONRenderer().render(build_payload(count, role))
+    return {
+        'identity': len(body),
+        'gzip': len(gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)),
+        'br': len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)) if brotli else None,
+    }
+
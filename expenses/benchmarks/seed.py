@@ -0,0 +1,117 @@
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+
+from expenses.models import Expense
+from users.models import CustomUser
+
+
+CATEGORIES = ['Food', 'Rent', 'Travel', 'Utilities', 'Health', 'Entertainment', 'Shopping', 'Education']
+
+# Typical amount (median, in currency units) of each category for skewed data
+CATEGORY_MEDIANS = {
+    'Food': 18, 'Rent': 900, 'Travel': 60, 'Utilities': 80,
+    'Health': 45, 'Entertainment': 25, 'Shopping': 40, 'Education': 120,
+}
+
+TITLES = {
+    'Food': ['Groceries', 'Lunch', 'Coffee', 'Dinner out', 'Bakery'],
+    'Rent': ['Monthly rent', 'Parking space'],
+    'Travel': ['Train ticket', 'Taxi', 'Fuel', 'Flight', 'Bus pass'],
+    'Utilities': ['Electricity', 'Water', 'Internet', 'Phone bill'],
+    'Health': ['Pharmacy', 'Dentist', 'Gym membership'],
+    'Entertainment': ['Cinema', 'Concert', 'Streaming subscription', 'Books'],
+    'Shopping': ['Clothes', 'Electronics', 'Home supplies', 'Gift'],
+    'Education': ['Online course', 'Textbooks', 'Workshop'],
+}
+
+
+def seed_users(count, prefix='bench_user', start=0):
+    """
+    Create `count` regular users in bulk and return every user with the prefix.
+    """
+    # Hashing a real password per user would dominate seeding time
+    password = make_password(None)
+    users = [
+        CustomUser(username=f'{prefix}_{i}', password=password)
+        for i in range(start, start + count)
+    ]
+    CustomUser.objects.bulk_create(users)
+    return list(CustomUser.objects.filter(username__startswith=f'{prefix}_').order_by('id'))
+
+
+def generate_expenses(users, count, days=3 * 365, rng=None):
+    """
+    Yield unsaved expenses spread evenly over the last `days` days.
+    """
+    rng = rng or random.Random(0)
+    today = date.today()
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        yield Expense(
+            title=f'Expense {i}',
+            amount=Decimal(rng.randint(100, 50000)) / 100,
+            category=category,
+            category_normalized=Expense.normalize_category(category),
+            date=today - timedelta(days=rng.randrange(days)),
+            user=rng.choice(users),
+        )
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Cumulative weights where the k-th item is 1/k^exponent as likely as the first.
+    """
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def generate_skewed_expenses(users, count, days=3 * 365, rng=None):
+    """
+    Yield unsaved expenses shaped like real data: a few users and categories own most
+    rows, recent dates are denser than old ones, and amounts are log-normal around
+    a per-category median.
+    """
+    rng = rng or random.Random(0)
+    today = date.today()
+    user_weights = zipf_weights(len(users))
+    category_weights = zipf_weights(len(CATEGORIES), exponent=0.9)
+    # Mean age of an expense, so about 1 in 7 rows is older than two mean ages
+    mean_age = days / 4
+    for i in range(count):
+        category = rng.choices(CATEGORIES, cum_weights=category_weights)[0]
+        age = min(int(rng.expovariate(1 / mean_age)), days - 1)
+        amount = CATEGORY_MEDIANS[category] * math.exp(rng.gauss(0, 0.6))
+        yield Expense(
+            title=f'{rng.choice(TITLES[category])} {i}',
+            amount=Decimal(max(1, round(amount * 100))) / 100,
+            category=category,
+            category_normalized=Expense.normalize_category(category),
+            date=today - timedelta(days=age),
+            user=rng.choices(users, cum_weights=user_weights)[0],
+        )
+
+
+def seed_expenses(users, count, batch_size=5000, rng=None, skewed=False, days=3 * 365, on_batch=None):
+    """
+    Insert `count` expenses for the given users in batches.
+    """
+    generate = generate_skewed_expenses if skewed else generate_expenses
+    batch = []
+    inserted = 0
+    for expense in generate(users, count, days=days, rng=rng):
+        batch.append(expense)
+        if len(batch) >= batch_size:
+            Expense.objects.bulk_create(batch)
+            inserted += len(batch)
+            batch = []
+            if on_batch:
+                on_batch(inserted)
+    if batch:
+        Expense.objects.bulk_create(batch)
+        inserted += len(batch)
+        if on_batch:
+            on_batch(inserted)
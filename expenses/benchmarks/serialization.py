@@ -0,0 +1,61 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from expenses.models import Expense
+from expenses.serializers.expense import ExpenseReadSerializer, ExpenseSerializer
+
+
+def build_rows(count):
+    """
+    Build `count` unsaved expenses and the matching values() rows, without touching the database.
+    """
+    start = date(2024, 1, 1)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    instances = [
+        Expense(
+            id=i + 1,
+            title=f'Expense {i}',
+            amount=Decimal(i % 50000) / 100,
+            category='Food',
+            date=start + timedelta(days=i % 1000),
+            created_at=created + timedelta(seconds=i),
+            updated_at=created + timedelta(seconds=i),
+            user_id=i % 100 + 1,
+        )
+        for i in range(count)
+    ]
+    fields = ['id', 'title', 'amount', 'category', 'date', 'created_at', 'updated_at', 'user']
+    rows = [
+        {field: getattr(instance, 'user_id' if field == 'user' else field) for field in fields}
+        for instance in instances
+    ]
+    return instances, rows
+
+
+def throughput(func, count, repeat):
+    """
+    Return the best rows/sec over `repeat` runs of func().
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return count / best if best else float('inf')
+
+
+def compare_serializers(count, role='regular', repeat=3):
+    """
+    Return (ModelSerializer rows/sec, read serializer rows/sec) for `count` rows.
+    """
+    request = SimpleNamespace(user=SimpleNamespace(role=role))
+    instances, rows = build_rows(count)
+    model_serializer = throughput(
+        lambda: ExpenseSerializer(instances, many=True, context={'request': request}).data, count, repeat
+    )
+    read_serializer = throughput(
+        lambda: ExpenseReadSerializer(request).serialize_many(rows), count, repeat
+    )
+    return model_serializer, read_serializer
@@ -0,0 +1,171 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import django
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from expenses.models import Expense
+
+
+class Rollback(Exception):
+    pass
+
+
+def timed_runs(func, iterations, warmup=2):
+    """
+    Return the latencies (seconds) of `iterations` calls to func() after a warmup.
+    """
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'iterations': len(latencies),
+        'ops_per_second': round(len(latencies) / total, 2) if total else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+    }
+
+
+def benchmark_cases(user):
+    """
+    Return (name, callable) pairs, each issuing one API request as the user.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+    today = date.today()
+    expense_id = Expense.objects.filter(user=user).values_list('id', flat=True).first()
+    export_params = {'start_date': (today - timedelta(days=365)).isoformat(), 'end_date': today.isoformat()}
+
+    def get(url, params=None):
+        def request():
+            response = client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            assert response.status_code == 200, (url, response.status_code)
+        return request
+
+    def analytics_uncached():
+        caches['default'].clear()
+        get(reverse('expense-analytics'))()
+
+    list_url = reverse('expense-list-create')
+    return [
+        ('list', get(list_url)),
+        ('list_cursor', get(list_url, {'pagination': 'cursor', 'page_size': 50})),
+        ('filter_category', get(list_url, {'category': 'food', 'count': 'false'})),
+        ('filter_amount_date', get(list_url, {
+            'min_amount': 50, 'start_date': export_params['start_date'], 'count': 'false',
+        })),
+        ('search_title', get(list_url, {'search': 'coffee', 'count': 'false'})),
+        ('detail', get(reverse('expense-detail', args=[expense_id]))),
+        ('analytics', analytics_uncached),
+        ('analytics_cached', get(reverse('expense-analytics'))),
+        ('export_csv', get(reverse('expense-export'), export_params)),
+        ('export_csv_gz', get(reverse('expense-export'), {**export_params, 'format': 'csv.gz'})),
+    ]
+
+
+def benchmark_create(user, iterations):
+    """
+    Time POSTs to the list endpoint. The created expenses are rolled back.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+    url = reverse('expense-list-create')
+    data = {'title': 'Benchmark', 'amount': '12.34', 'category': 'Food', 'date': date.today().isoformat()}
+
+    def create():
+        response = client.post(url, data, format='json')
+        assert response.status_code == 201, response.status_code
+
+    latencies = []
+    try:
+        with transaction.atomic():
+            latencies = timed_runs(create, iterations)
+            raise Rollback
+    except Rollback:
+        pass
+    caches['default'].clear()
+    return latencies
+
+
+def run_suite(user, iterations, only=None):
+    """
+    Run every benchmark case as the user and return {case: summary}.
+    """
+    results = {}
+    for name, func in benchmark_cases(user):
+        if only and name not in only:
+            continue
+        results[name] = summarize(timed_runs(func, iterations))
+    if not only or 'create' in only:
+        results['create'] = summarize(benchmark_create(user, iterations))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(user):
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'user': user.username,
+        'role': user.role,
+        'user_expenses': Expense.objects.filter(user=user).count(),
+        'total_expenses': Expense.objects.count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Return (case, baseline p50, current p50, change) for cases whose median
+    latency grew by more than `threshold` (0.2 = 20%) against the baseline.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('p50_ms'):
+            continue
+        change = current['p50_ms'] / previous['p50_ms'] - 1
+        if change > threshold:
+            regressions.append((name, previous['p50_ms'], current['p50_ms'], change))
+    return regressions
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def save_results(path, report):
+    with open(path, 'w') as results_file:
+        json.dump(report, results_file, indent=2)
+        results_file.write('\n')
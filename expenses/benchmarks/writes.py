@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+
+
+SCHEMA = [
+    """
+    CREATE TABLE expense (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, amount DECIMAL, category TEXT,
+        date DATE, user_id INTEGER, created_at DATETIME
+    )
+    """,
+    "CREATE INDEX expense_user_date ON expense (user_id, date)",
+    """
+    CREATE TABLE rollup (
+        user_id INTEGER, category TEXT, date DATE, total DECIMAL, count INTEGER,
+        PRIMARY KEY (user_id, category, date)
+    )
+    """,
+]
+
+# One expense creation as the API runs it: insert the row, then bump its daily rollup
+CREATE_SQL = [
+    "INSERT INTO expense (title, amount, category, date, user_id, created_at) "
+    "VALUES ('Benchmark', 12.5, 'Food', :date, :user, datetime('now'))",
+    "INSERT INTO rollup VALUES (:user, 'Food', :date, 12.5, 1) "
+    "ON CONFLICT (user_id, category, date) DO UPDATE SET total = total + 12.5, count = count + 1",
+]
+
+# A list request: count and fetch the user's newest page
+READ_SQL = [
+    "SELECT COUNT(*) FROM expense WHERE user_id = :user",
+    "SELECT * FROM expense WHERE user_id = :user ORDER BY date DESC, id DESC LIMIT 20",
+]
+
+
+def connect(path, pragmas):
+    """
+    Open an autocommit connection like Django's SQLite backend does, with the given pragmas.
+    """
+    # Python's default 5 second timeout doubles as the busy timeout unless a pragma overrides it
+    connection = sqlite3.connect(path, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+
+def create_database(path, rows=10000, users=20):
+    connection = sqlite3.connect(path)
+    for sql in SCHEMA:
+        connection.execute(sql)
+    connection.executemany(
+        "INSERT INTO expense (title, amount, category, date, user_id, created_at) "
+        "VALUES ('Seed', 10, 'Food', ?, ?, datetime('now'))",
+        ((date(2025, 1 + i % 12, 1 + i % 28).isoformat(), i % users) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def run_workers(path, profile, writers, readers, duration):
+    """
+    Run writer and reader threads against the database for `duration` seconds.
+    Returns committed writes, completed reads and "database is locked" errors.
+    """
+    stop = time.perf_counter() + duration
+    totals = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(statements, kind, user):
+        done = errors = 0
+        connection = None
+        params = {'user': user, 'date': date.today().isoformat()}
+        begin = 'BEGIN IMMEDIATE' if profile['immediate'] else 'BEGIN'
+        while time.perf_counter() < stop:
+            if connection is None:
+                connection = connect(path, profile['pragmas'])
+            try:
+                if kind == 'writes':
+                    connection.execute(begin)
+                    for sql in statements:
+                        connection.execute(sql, params)
+                    connection.execute('COMMIT')
+                else:
+                    for sql in statements:
+                        connection.execute(sql, params).fetchall()
+                done += 1
+            except sqlite3.OperationalError as error:
+                if 'locked' not in str(error) and 'busy' not in str(error):
+                    raise
+                errors += 1
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+            if not profile['persistent']:
+                connection.close()
+                connection = None
+        if connection is not None:
+            connection.close()
+        with lock:
+            totals[kind] += done
+            totals['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(CREATE_SQL, 'writes', i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=(READ_SQL, 'reads', i)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'writes_per_second': totals['writes'] / elapsed,
+        'reads_per_second': totals['reads'] / elapsed,
+        'errors': totals['errors'],
+    }
+
+
+def compare_profiles(profiles, writers, readers, duration, rows=10000):
+    """
+    Run the workload once per profile, each on a fresh database file, and yield
+    (profile name, result).
+    """
+    for name, profile in profiles.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            create_database(path, rows=rows)
+            yield name, run_workers(path, profile, writers, readers, duration)
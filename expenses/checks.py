@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def check_version_cache(app_configs, **kwargs):
+    """
+    Warn when the expense versions live in a per-process cache, where a write served
+    by one worker leaves the others answering 304 with their older versions.
+    """
+    backend = settings.CACHES.get(settings.EXPENSE_VERSION_CACHE_ALIAS, {}).get('BACKEND', '')
+    if backend != f'{LocMemCache.__module__}.{LocMemCache.__name__}':
+        return []
+    return [
+        Warning(
+            f"EXPENSE_VERSION_CACHE_ALIAS '{settings.EXPENSE_VERSION_CACHE_ALIAS}' uses LocMemCache, "
+            "which is not shared between processes.",
+            hint="Point it at a shared cache such as Redis, Memcached or the database cache; "
+                 "until then ETags may go stale for up to EXPENSE_VERSION_TIMEOUT seconds.",
+            id='expenses.W001',
+        )
+    ]
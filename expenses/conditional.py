@@ -0,0 +1,65 @@
+import hashlib
+import math
+import time
+from datetime import date
+from functools import partial, wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from expenses.services.cache import ExpenseVersionCache
+
+
+def get_etag(request, token, day=None):
+    """
+    Build a strong ETag from the expense version token and everything else the
+    response depends on: the URL with its query, the caller's role, the Accept header
+    and, for responses computed relative to today, the date.
+    """
+    parts = [
+        token,
+        request.build_absolute_uri(),
+        request.user.role,
+        request.META.get('HTTP_ACCEPT', ''),
+        str(settings.ANALYTICS_CACHE_VERSION),
+        day.isoformat() if day else '',
+    ]
+    return '"%s"' % hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+
+def conditional_get(view_method=None, daily=False):
+    """
+    Decorate an APIView GET handler whose response depends only on the caller's
+    expenses (every expense for admins), and on today's date when daily is set,
+    as in @conditional_get(daily=True). A request whose If-None-Match or
+    If-Modified-Since still matches gets a 304 from the version cache alone, without
+    a database query; other responses carry ETag and Last-Modified headers.
+    Last-Modified has one-second resolution, so clients should prefer If-None-Match.
+    """
+    if view_method is None:
+        return partial(conditional_get, daily=daily)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        admin = request.user.role == 'admin'
+        # Read the version before the data, so an ETag never vouches for older rows
+        token, modified = ExpenseVersionCache.get(request.user.id, admin)
+        day = date.today() if daily else None
+        if day:
+            # Nothing computed before midnight describes today
+            modified = max(modified, time.mktime(day.timetuple()))
+        etag = get_etag(request, token, day)
+        # Round up, so Last-Modified is never earlier than the write it stands for
+        last_modified = math.ceil(modified)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
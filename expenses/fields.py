@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import ExpressionWrapper, F, Func
+
+
+def format_minor_units(value, decimal_places):
+    """
+    Render an integer number of minor units as a plain decimal string, e.g. 1250 -> '12.50'.
+    """
+    # Float division rounds back to the exact digits for up to 15 significant digits,
+    # which covers every MoneyField (max_digits <= 14), and is faster than a Decimal
+    return '%.*f' % (decimal_places, value / 10 ** decimal_places)
+
+
+class MoneyField(models.DecimalField):
+    """
+    A DecimalField stored as an integer number of minor units (cents for two decimal
+    places). Models, serializers and the API still see Decimal values, while sums run
+    on integers in the database and hot paths can read the raw units with minor_units().
+    """
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def to_minor_units(self, value):
+        return int(value.scaleb(self.decimal_places).to_integral_value())
+
+    def from_minor_units(self, value):
+        if not isinstance(value, int):
+            # Averages and other non-integral results of database functions
+            value = Decimal(str(value))
+        return Decimal(value).scaleb(-self.decimal_places)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # Lookups pass prepared values, which still need scaling
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return self.to_minor_units(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.from_minor_units(value)
+
+
+class MinorUnitsTextField(models.BigIntegerField):
+    """
+    Output field rendering minor units as a decimal string, so rows written out as
+    text skip building a Decimal per value.
+    """
+    def __init__(self, *args, decimal_places=2, **kwargs):
+        self.decimal_places = decimal_places
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return format_minor_units(value, self.decimal_places)
+
+
+def minor_units(name):
+    """
+    Select a MoneyField as its raw integer minor units.
+    """
+    return ExpressionWrapper(F(name), output_field=models.BigIntegerField())
+
+
+class MinorUnitsText(Func):
+    """
+    A MoneyField column as a decimal string, e.g. '12.50'. SQLite formats it in the
+    query; other databases return the integer, formatted by the output field.
+    """
+    def __init__(self, expression, decimal_places):
+        self.decimal_places = decimal_places
+        super().__init__(expression, output_field=MinorUnitsTextField(decimal_places=decimal_places))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return compiler.compile(self.source_expressions[0])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        # %% survives the backend's parameter placeholder conversion as a single %
+        return f"printf('%%.{self.decimal_places}f', {sql} / {10 ** self.decimal_places}.0)", params
+
+    def get_db_converters(self, connection):
+        if connection.vendor == 'sqlite':
+            return []
+        return super().get_db_converters(connection)
+
+
+def minor_units_text(model, name):
+    """
+    Select a MoneyField as a decimal string, e.g. '12.50'.
+    """
+    return MinorUnitsText(F(name), decimal_places=model._meta.get_field(name).decimal_places)
@@ -1,14 +1,44 @@
+from django.conf import settings
 from django_filters import rest_framework as filters
 
 from expenses.models import Expense
+from expenses.repositories.search import ExpenseSearchRepository
 
 class ExpenseFilter(filters.FilterSet):
+    CATEGORY_MATCHES = ('exact', 'prefix', 'contains')
+
     start_date = filters.DateFilter(field_name="date", lookup_expr="gte")
     end_date = filters.DateFilter(field_name="date", lookup_expr="lte")
     min_amount = filters.NumberFilter(field_name="amount", lookup_expr="gte")
     max_amount = filters.NumberFilter(field_name="amount", lookup_expr="lte")
-    category = filters.CharFilter(field_name="category", lookup_expr="icontains")
+    # Matched against the indexed normalized category; ?category_match=exact|prefix|contains
+    category = filters.CharFilter(method="filter_category")
+    search = filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Expense
-        fields = ['category', 'start_date', 'end_date', 'min_amount', 'max_amount']
\ No newline at end of file
+        fields = ['category', 'start_date', 'end_date', 'min_amount', 'max_amount', 'search']
+
+    def filter_category(self, queryset, name, value):
+        """
+        Filter by category, case-insensitively.
+        Exact and prefix matches are index range scans; contains falls back to a scan.
+        """
+        match = self.data.get('category_match') or settings.EXPENSE_CATEGORY_MATCH
+        if match not in self.CATEGORY_MATCHES:
+            match = 'contains'
+        normalized = Expense.normalize_category(value)
+        if match == 'contains':
+            return queryset.filter(category_normalized__contains=normalized)
+        if match == 'prefix':
+            # A closed range instead of LIKE 'x%', so any backend can use the index
+            return queryset.filter(
+                category_normalized__gte=normalized, category_normalized__lt=normalized + '\U0010ffff'
+            )
+        return queryset.filter(category_normalized=normalized)
+
+    def filter_search(self, queryset, name, value):
+        """
+        Full-text search on the title.
+        """
+        return ExpenseSearchRepository.search_titles(queryset, value)
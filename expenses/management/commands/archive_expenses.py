@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.repositories.archive import ExpenseArchiveRepository
+from expenses.services.cache import ExpenseVersionCache
+
+
+class Command(BaseCommand):
+    help = (
+        "Move expenses dated more than EXPENSE_ARCHIVE_AFTER_DAYS ago from the expense "
+        "table to the archive table, keeping the hot table and its indexes small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Expenses moved per transaction.")
+
+    def handle(self, *args, **options):
+        cutoff = ExpenseArchiveRepository.get_cutoff()
+        if cutoff is None:
+            raise CommandError("Archiving is off; set EXPENSE_ARCHIVE_AFTER_DAYS first.")
+        batch_size = options['batch_size'] or settings.EXPENSE_ARCHIVE_BATCH_SIZE
+        moved, user_ids = ExpenseArchiveRepository.archive_before(cutoff, batch_size=batch_size)
+        if user_ids:
+            # Archived expenses leave the expense list, so cached list responses are stale
+            ExpenseVersionCache.bump(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} expenses dated before {cutoff}."))
@@ -0,0 +1,52 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from expenses.benchmarks.load import compare_handlers, endpoint_paths
+from expenses.benchmarks.seed import seed_expenses, seed_users
+from expenses.models import Expense
+from expenses.repositories.rollup import ExpenseRollupRepository
+from users.models import CustomUser
+from users.tokens import ClaimsRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and latency of the sync endpoints under WSGI with the async "
+        "endpoints under ASGI, using in-process clients at a fixed concurrency. Seeds a "
+        "benchmark user, which is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Expenses to seed for the benchmark user.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and handler.")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument('--endpoints', nargs='+', help="Subset of: list, detail, analytics, export.")
+
+    def handle(self, *args, **options):
+        # The clients run on other threads, so the data must be committed rather than rolled back
+        CustomUser.objects.filter(username__startswith='bench_asgi_').delete()
+        user = seed_users(1, prefix='bench_asgi')[0]
+        try:
+            seed_expenses([user], options['rows'], rng=random.Random(0))
+            ExpenseRollupRepository.rebuild([user.id])
+            self.run(user, options)
+        finally:
+            user.delete()
+
+    def run(self, user, options):
+        token = str(ClaimsRefreshToken.for_user(user).access_token)
+        paths = endpoint_paths(Expense.objects.filter(user=user).values_list('id', flat=True).first())
+        if options['endpoints']:
+            paths = {name: paths[name] for name in options['endpoints']}
+
+        self.stdout.write(
+            f"{options['requests']} requests per endpoint at concurrency {options['concurrency']}\n"
+            f"{'endpoint':<10}  {'handler':<5}  {'req/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  errors"
+        )
+        for name, wsgi, asgi in compare_handlers(paths, token, options['requests'], options['concurrency']):
+            for handler, result in (('wsgi', wsgi), ('asgi', asgi)):
+                self.stdout.write(
+                    f"{name:<10}  {handler:<5}  {result['rps']:>8.1f}  {result['p50']:>8.2f}  "
+                    f"{result['p99']:>8.2f}  {result['errors']}"
+                )
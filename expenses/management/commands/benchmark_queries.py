@@ -0,0 +1,77 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from expenses.benchmarks.queries import measure, repository_cases
+from expenses.benchmarks.seed import seed_expenses, seed_users
+from expenses.models import Expense
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic expenses and report query plans and latency of each "
+        "ExpenseRepository read method with and without the Expense indexes. "
+        "All changes are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Number of expenses to seed.")
+        parser.add_argument('--users', type=int, default=100, help="Number of users owning them.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per method (best is reported).")
+        parser.add_argument('--admin', action='store_true', help="Benchmark the admin (all users) paths.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Benchmark data rolled back.")
+
+    def run(self, options):
+        self.stdout.write(f"Seeding {options['rows']} expenses for {options['users']} users...")
+        users = seed_users(options['users'])
+        seed_expenses(users, options['rows'], rng=random.Random(0))
+        with connection.cursor() as cursor:
+            # Refresh planner statistics so the plans reflect the seeded data
+            cursor.execute('ANALYZE')
+
+        user = users[0]
+        cases = repository_cases(user, admin=options['admin'])
+
+        after = {name: measure(func, options['repeat'], 'with indexes') for name, func in cases}
+        self.drop_indexes()
+        before = {name: measure(func, options['repeat'], 'without indexes') for name, func in cases}
+
+        for name, _ in cases:
+            before_time, before_plans = before[name]
+            after_time, after_plans = after[name]
+            speedup = before_time / after_time if after_time else float('inf')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                f"  without indexes: {before_time * 1000:9.2f} ms   "
+                f"with indexes: {after_time * 1000:9.2f} ms   ({speedup:.1f}x)"
+            )
+            self.write_plans('  plan without indexes:', before_plans)
+            self.write_plans('  plan with indexes:', after_plans)
+
+    def drop_indexes(self):
+        """
+        Drop the Expense indexes inside the current transaction.
+        """
+        editor = connection.schema_editor()
+        table = editor.quote_name(Expense._meta.db_table)
+        with connection.cursor() as cursor:
+            for index in Expense._meta.indexes:
+                cursor.execute(editor.sql_delete_index % {'name': editor.quote_name(index.name), 'table': table})
+
+    def write_plans(self, title, plans):
+        self.stdout.write(title)
+        for plan in plans:
+            for line in plan:
+                self.stdout.write(f"    {line}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from expense_tracker.renderers import orjson
+from expenses.benchmarks.rendering import compare_encodings, compare_renderers
+
+
+class Command(BaseCommand):
+    help = "Compare JSON render throughput of JSONRenderer and FastJSONRenderer, and the compressed body sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000], help="Row counts to render.")
+        parser.add_argument('--role', choices=['regular', 'admin'], default='regular')
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per size (best is reported).")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; FastJSONRenderer falls back to JSONRenderer."))
+        self.stdout.write(f"{'rows':>8}  {'JSONRenderer':>16}  {'FastJSONRenderer':>18}  speedup")
+        for size in options['sizes']:
+            stdlib, fast = compare_renderers(size, options['role'], options['repeat'])
+            self.stdout.write(f"{size:>8}  {stdlib:>10,.0f} rows/s  {fast:>12,.0f} rows/s  {fast / stdlib:6.1f}x")
+
+        self.stdout.write('')
+        self.stdout.write(f"{'rows':>8}  {'identity':>12}  {'gzip':>12}  {'br':>12}")
+        for size in options['sizes']:
+            sizes = compare_encodings(size, options['role'])
+            br = f"{sizes['br']:>10,} B" if sizes['br'] is not None else f"{'n/a':>12}"
+            self.stdout.write(f"{size:>8}  {sizes['identity']:>10,} B  {sizes['gzip']:>10,} B  {br}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from expenses.benchmarks.serialization import compare_serializers
+
+
+class Command(BaseCommand):
+    help = "Compare list serialization throughput of ExpenseSerializer and ExpenseReadSerializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000], help="Row counts to serialize.")
+        parser.add_argument('--role', choices=['regular', 'admin'], default='regular')
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per size (best is reported).")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'ExpenseSerializer':>20}  {'ExpenseReadSerializer':>22}  speedup")
+        for size in options['sizes']:
+            model_serializer, read_serializer = compare_serializers(size, options['role'], options['repeat'])
+            self.stdout.write(
+                f"{size:>8}  {model_serializer:>14,.0f} rows/s  {read_serializer:>16,.0f} rows/s  "
+                f"{read_serializer / model_serializer:6.1f}x"
+            )
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from expenses.benchmarks.writes import compare_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite write throughput under concurrent writers and readers with the "
+        "database profile in settings (persistent connections, SQLITE_PRAGMAS, immediate "
+        "transactions) and with plain SQLite defaults, on scratch database files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Threads creating expenses.")
+        parser.add_argument('--readers', type=int, default=8, help="Threads listing expenses.")
+        parser.add_argument('--duration', type=float, default=5, help="Seconds each profile runs.")
+        parser.add_argument('--rows', type=int, default=10000, help="Expenses seeded before each run.")
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        profiles = {
+            'defaults': {'pragmas': {}, 'immediate': False, 'persistent': False},
+            'profile': {
+                'pragmas': settings.SQLITE_PRAGMAS,
+                'immediate': database.get('OPTIONS', {}).get('transaction_mode') == 'IMMEDIATE',
+                'persistent': bool(database.get('CONN_MAX_AGE')),
+            },
+        }
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['duration']:g}s per profile\n"
+            f"{'profile':<10}  {'writes/s':>9}  {'reads/s':>9}  locked errors"
+        )
+        for name, result in compare_profiles(
+            profiles, options['writers'], options['readers'], options['duration'], rows=options['rows']
+        ):
+            self.stdout.write(
+                f"{name:<10}  {result['writes_per_second']:>9.1f}  {result['reads_per_second']:>9.1f}  "
+                f"{result['errors']}"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from expenses.repositories.money import MoneyStorageRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the decimal amount and total columns of an existing database to integer "
+        "minor units. Run it once, before migrating to MoneyField columns; converted "
+        "columns are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to convert.")
+
+    def handle(self, *args, **options):
+        for model, name in MoneyStorageRepository.FIELDS:
+            label = f"{model._meta.db_table}.{name}"
+            if MoneyStorageRepository.convert(model, name, using=options['database']):
+                self.stdout.write(self.style.SUCCESS(f"Converted {label} to minor units."))
+            else:
+                self.stdout.write(f"{label} needs no conversion.")
@@ -0,0 +1,78 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.services.importer import ExpenseImportService
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Import expenses for a user from a CSV or OFX file. The file is read as a stream and "
+        "committed in batches; after a failure, run again with --resume to continue from the "
+        "last committed row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or OFX file to import.")
+        parser.add_argument('--user', required=True, help="Username owning the imported expenses.")
+        parser.add_argument('--format', choices=ExpenseImportService.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, help="Rows committed per batch.")
+        parser.add_argument('--checkpoint', help="Checkpoint file. Defaults to <path>.checkpoint.")
+        parser.add_argument('--resume', action='store_true', help="Skip the rows recorded in the checkpoint.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ExpenseImportService.FORMATS:
+            raise CommandError("Cannot tell the file format; pass --format.")
+        try:
+            user = CustomUser.objects.get(username=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        start_row = self.read_checkpoint(checkpoint) if options['resume'] else 0
+        if start_row:
+            self.stdout.write(f"Resuming after row {start_row}.")
+
+        def on_batch(result):
+            self.write_checkpoint(checkpoint, result.last_row)
+            self.stdout.write(
+                f"row {result.last_row}: {result.imported} imported, {result.failed} failed, "
+                f"{result.rows_per_second:.0f} rows/s"
+            )
+
+        with open(path, newline='', encoding='utf-8-sig') as lines:
+            try:
+                result = ExpenseImportService.run(
+                    lines, user, file_format, batch_size=options['batch_size'], start_row=start_row,
+                    on_batch=on_batch,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.imported} of {result.rows} rows ({result.failed} failed) "
+            f"in {result.elapsed:.1f}s, {result.rows_per_second:.0f} rows/s."
+        ))
+
+    @staticmethod
+    def read_checkpoint(path):
+        try:
+            with open(path) as checkpoint:
+                return json.load(checkpoint)['last_row']
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def write_checkpoint(path, last_row):
+        # Write then rename so a crash never leaves a half-written checkpoint
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            json.dump({'last_row': last_row}, checkpoint)
+        os.replace(f'{path}.tmp', path)
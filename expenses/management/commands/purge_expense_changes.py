@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from expenses.services.sync import ExpenseSyncService
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expense change log entries older than EXPENSE_SYNC_RETENTION_DAYS. "
+        "Sync tokens pointing before the oldest kept entry are rejected, so clients holding them resync."
+    )
+
+    def handle(self, *args, **options):
+        deleted = ExpenseSyncService.purge_change_log()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log entries."))
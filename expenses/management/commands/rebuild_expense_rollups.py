@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.repositories.rollup import ExpenseRollupRepository
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily expense rollups from raw expenses in batches of users and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Users processed per batch.")
+        parser.add_argument('--verify-only', action='store_true', help="Only compare rollups against raw data.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(CustomUser.objects.order_by('id').values_list('id', flat=True))
+
+        rebuilt = 0
+        mismatches = {}
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            if not options['verify_only']:
+                rebuilt += ExpenseRollupRepository.rebuild(batch)
+            mismatches.update(ExpenseRollupRepository.find_mismatches(batch))
+            self.stdout.write(f"Processed {min(start + batch_size, len(user_ids))}/{len(user_ids)} users")
+
+        if not options['verify_only']:
+            self.stdout.write(f"Rebuilt {rebuilt} rollup rows.")
+
+        if mismatches:
+            for (user_id, category, day), (expected, stored) in sorted(mismatches.items(), key=str):
+                self.stderr.write(
+                    f"user={user_id} category={category} date={day}: expected {expected}, stored {stored}"
+                )
+            raise CommandError(f"{len(mismatches)} rollup rows do not match the raw expenses.")
+        self.stdout.write(self.style.SUCCESS("Rollups match the raw expenses."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from expenses.services.dashboard import AdminDashboardService
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the materialized admin dashboards with the expenses created or changed "
+        "since the last refresh. Run it from cron, or with --interval as a long-lived process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild the summaries from every expense.")
+        parser.add_argument('--interval', type=float, help="Keep refreshing every this many seconds.")
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            state = AdminDashboardService.refresh(full=full)
+            self.stdout.write(
+                f"Refreshed admin dashboards as of {state.refreshed_at:%Y-%m-%d %H:%M:%S} "
+                f"in {time.perf_counter() - started:.2f}s."
+            )
+            if not options['interval']:
+                break
+            full = False
+            time.sleep(options['interval'])
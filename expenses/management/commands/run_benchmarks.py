@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from expenses.benchmarks.suite import compare, environment, load_results, run_suite, save_results
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the list, filter, detail, analytics, export and create endpoints against "
+        "the current database (see seed_expenses), save the results as JSON and flag cases "
+        "whose median latency regressed against a baseline run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to benchmark as. Defaults to the user with the most expenses.")
+        parser.add_argument('--admin', action='store_true', help="Benchmark as an admin (all users' expenses).")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per case.")
+        parser.add_argument('--cases', nargs='+', help="Only run these cases.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Results JSON of an earlier run to compare against.")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Median latency increase that counts as a regression (0.2 = 20%%).",
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error on regressions.")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options)
+        report = {'environment': environment(user), 'results': {}}
+        self.stdout.write(
+            f"Benchmarking as {user.username} ({report['environment']['user_expenses']} of "
+            f"{report['environment']['total_expenses']} expenses), {options['iterations']} iterations per case"
+        )
+
+        report['results'] = run_suite(user, options['iterations'], options['cases'])
+        self.stdout.write(f"{'case':<20}  {'ops/s':>9}  {'mean ms':>9}  {'p50 ms':>9}  {'p95 ms':>9}")
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f"{name:<20}  {result['ops_per_second']:>9.1f}  {result['mean_ms']:>9.2f}  "
+                f"{result['p50_ms']:>9.2f}  {result['p95_ms']:>9.2f}"
+            )
+
+        if options['output']:
+            save_results(options['output'], report)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if options['baseline']:
+            self.check_baseline(report, options)
+
+    def get_user(self, options):
+        if options['user']:
+            try:
+                user = CustomUser.objects.get(username=options['user'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+        else:
+            user = (
+                CustomUser.objects.annotate(expense_count=Count('expense'))
+                .order_by('-expense_count').first()
+            )
+            if user is None or not user.expense_count:
+                raise CommandError("No expenses to benchmark; run seed_expenses first.")
+        if options['admin']:
+            # Only the role matters to the endpoints; nothing is saved
+            user.role = 'admin'
+        return user
+
+    def check_baseline(self, report, options):
+        baseline = load_results(options['baseline'])
+        if baseline.get('environment', {}).get('total_expenses') != report['environment']['total_expenses']:
+            self.stdout.write(self.style.WARNING("The baseline was recorded on a different dataset."))
+        regressions = compare(report['results'], baseline.get('results', {}), options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+            return
+        for name, before, after, change in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"REGRESSION {name}: p50 {before:.2f} ms -> {after:.2f} ms ({change:+.0%})"
+            ))
+        if options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} benchmark cases regressed.")
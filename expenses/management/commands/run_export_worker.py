@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from expenses.repositories.export_job import ExportJobRepository
+from expenses.services.export_job import ExportJobService
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued export jobs. Use this with EXPORT_JOB_IN_PROCESS = False to keep "
+        "export work out of the web processes; several workers can share the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help="Worker threads in this process.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds between polls of an empty queue.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument(
+            '--requeue', action='store_true',
+            help=(
+                "Requeue every job left running by a stopped worker, without waiting for "
+                "EXPORT_JOB_TIMEOUT. Only safe when no other worker is running."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue']:
+            self.stdout.write(f"Requeued {ExportJobRepository.requeue_running_jobs()} jobs.")
+
+        self.stdout.write(f"Processing export jobs with {options['threads']} threads.")
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            workers = [
+                executor.submit(ExportJobService.work, options['poll_interval'], options['once'])
+                for _ in range(options['threads'])
+            ]
+            for worker in workers:
+                worker.result()
+        self.stdout.write(self.style.SUCCESS("Export queue is empty."))
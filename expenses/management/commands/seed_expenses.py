@@ -0,0 +1,53 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expenses.benchmarks.seed import seed_expenses, seed_users
+from expenses.repositories.rollup import ExpenseRollupRepository
+from expenses.services.cache import AnalyticsCache, ExpenseVersionCache
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users and expenses in bulk. By default the data is skewed like "
+        "real usage: a few heavy users and categories, more recent dates, log-normal amounts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Number of users to create.")
+        parser.add_argument('--expenses', type=int, default=100_000, help="Number of expenses to create.")
+        parser.add_argument('--days', type=int, default=3 * 365, help="Spread dates over this many past days.")
+        parser.add_argument('--prefix', default='seed_user', help="Username prefix of the generated users.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible data.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT.")
+        parser.add_argument('--uniform', action='store_true', help="Spread users, categories and dates evenly.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        started = time.perf_counter()
+        with transaction.atomic():
+            existing = CustomUser.objects.filter(username__startswith=f'{prefix}_').count()
+            users = seed_users(options['users'], prefix=prefix, start=existing)[existing:]
+            self.stdout.write(f"Created {len(users)} users with prefix {prefix!r}.")
+
+            def on_batch(inserted):
+                self.stdout.write(f"  {inserted} expenses inserted")
+
+            seed_expenses(
+                users, options['expenses'], batch_size=options['batch_size'], rng=random.Random(options['seed']),
+                skewed=not options['uniform'], days=options['days'], on_batch=on_batch,
+            )
+            # bulk_create skips the incremental rollup updates, so rebuild them for the new users
+            user_ids = [user.id for user in users]
+            rollups = ExpenseRollupRepository.rebuild(user_ids)
+        AnalyticsCache.invalidate(user_ids)
+        ExpenseVersionCache.bump(user_ids)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['expenses']} expenses and {rollups} rollups in {elapsed:.1f}s "
+            f"({options['expenses'] / elapsed:,.0f} rows/s)."
+        ))
@@ -1,14 +1,233 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from expenses.fields import MoneyField
+
 
 class Expense(models.Model):
     title = models.CharField(max_length=255)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=50)
+    # Case- and whitespace-insensitive copy of category used for indexed filtering
+    category_normalized = models.CharField(max_length=50, editable=False, default='')
     date = models.DateField()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Date range filters for a user (list filters, export, monthly/weekly totals)
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            # Per-category sums for a user, answered from the index alone
+            models.Index(fields=['user', 'category', 'amount'], name='expense_user_category_idx'),
+            # Highest single expense for a user
+            models.Index(fields=['user', '-amount'], name='expense_user_amount_idx'),
+            # Admin date range exports across all users
+            models.Index(fields=['date'], name='expense_date_idx'),
+            # Exact and prefix category filters, for a user and across all users
+            models.Index(fields=['user', 'category_normalized'], name='expense_user_catnorm_idx'),
+            models.Index(fields=['category_normalized'], name='expense_catnorm_idx'),
+            # Rows added since the last admin dashboard refresh
+            models.Index(fields=['created_at'], name='expense_created_idx'),
+        ]
+
+    @staticmethod
+    def normalize_category(category):
+        """
+        Lowercase the category and collapse its whitespace.
+        """
+        return ' '.join((category or '').split()).lower()
+
+    def save(self, *args, **kwargs):
+        self.category_normalized = Expense.normalize_category(self.category)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'category_normalized'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} - {self.amount}"
 
+
+class ExpenseDailyRollup(models.Model):
+    """
+    Running total of a user's expenses for one category on one day.
+    Maintained incrementally by ExpenseRepository on every write.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    category = models.CharField(max_length=50)
+    date = models.DateField()
+    total = MoneyField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'date'], name='expense_rollup_unique'),
+        ]
+        indexes = [
+            # Time series date ranges, for a user and across all users
+            models.Index(fields=['user', 'date'], name='rollup_user_date_idx'),
+            models.Index(fields=['date'], name='rollup_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} {self.date} - {self.total}"
+
+
+class ExportJob(models.Model):
+    """
+    A CSV export written to disk by a background worker.
+    Jobs with the same key (scope and date range) share one result while in progress.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # 'admin' for exports across all users, otherwise 'user:<id>'
+    scope = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file_path = models.CharField(max_length=255, blank=True, default='')
+    rows = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending job
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+        ]
+        constraints = [
+            # At most one job in progress per key; identical requests join it
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status__in=['pending', 'running']), name='exportjob_active_key_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.key} - {self.status}"
+
+
+class ExpenseChangeLog(models.Model):
+    """
+    A create, update or delete of an expense, with the owner and date it had before the
+    change. The id is the change sequence served by the sync feed; delete entries are
+    the tombstones of removed expenses.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OP_CHOICES = [
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    ]
+
+    # Plain columns rather than foreign keys, so entries outlive deleted rows
+    expense_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    date = models.DateField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # A user's changes after a sync position
+            models.Index(fields=['user_id', 'id'], name='changelog_user_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.op} {self.expense_id} at {self.changed_at}"
+
+
+class ExpenseMonthlySummary(models.Model):
+    """
+    Materialized total of a user's expenses for one category in one month, the grain
+    of the admin dashboards. Refreshed per (user, month) partition.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    month = models.DateField()
+    category = models.CharField(max_length=50)
+    total = MoneyField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'category'], name='expense_monthly_summary_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} {self.month:%Y-%m} - {self.total}"
+
+
+class AdminTopExpense(models.Model):
+    """
+    The largest expenses across all users, archived ones included, as of the last
+    dashboard refresh. The expense is copied rather than referenced, since it may
+    live in either Expense or ArchivedExpense.
+    """
+    rank = models.IntegerField()
+    expense_id = models.BigIntegerField(unique=True)
+    title = models.CharField(max_length=255)
+    amount = MoneyField(max_digits=10, decimal_places=2)
+    category = models.CharField(max_length=50)
+    date = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return f"#{self.rank} {self.expense_id}"
+
+
+class SummaryRefreshState(models.Model):
+    """
+    Progress of a materialized summary: rows created or changed after the
+    watermark have not been folded in yet.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} refreshed at {self.refreshed_at}"
+
+
+class ArchivedExpense(models.Model):
+    """
+    An expense moved out of the hot table by `manage.py archive_expenses`. The columns
+    match Expense one for one, ids included, so the two tables can be queried as a UNION.
+    Its amounts stay in the rollups and dashboard summaries.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    amount = MoneyField(max_digits=10, decimal_places=2)
+    category = models.CharField(max_length=50)
+    category_normalized = models.CharField(max_length=50, default='')
+    date = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='archived_user_date_idx'),
+            models.Index(fields=['date'], name='archived_date_idx'),
+            models.Index(fields=['user', '-amount'], name='archived_user_amount_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.amount}"
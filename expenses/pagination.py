@@ -0,0 +1,176 @@
+import base64
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def is_disabled(value):
+    return value is not None and value.lower() in ('0', 'false', 'no')
+
+
+class ExpensePageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination with a client-selectable page size.
+    Pass ?count=false to skip the COUNT(*) query; the response then omits "count"
+    and "next" is derived from fetching one extra row.
+    """
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+
+    @property
+    def max_page_size(self):
+        # Read per request, so the setting can change after import
+        return settings.PAGINATION_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = not is_disabled(request.query_params.get(self.count_query_param))
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param), message='Invalid page.'
+            ))
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.with_count:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+
+class ExpenseKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (date, id), newest first.
+    The opaque cursor holds the position of the last row served, so every page is
+    an index range scan and deep pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    @property
+    def max_page_size(self):
+        return settings.PAGINATION_MAX_PAGE_SIZE
+
+    def get_page_size(self, params):
+        """
+        Read the page size from the query parameters, capped at max_page_size.
+        """
+        try:
+            page_size = int(params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    @staticmethod
+    def apply_position(queryset, position):
+        """
+        Order the queryset newest first and keep only the rows after the given position.
+        """
+        queryset = queryset.order_by('-date', '-id')
+        if position:
+            last_date, last_id = position
+            # The date bound alone is index-friendly; the OR only breaks ties within that date
+            queryset = queryset.filter(Q(date__lte=last_date) & (Q(date__lt=last_date) | Q(id__lt=last_id)))
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request.query_params)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        rows = list(self.apply_position(queryset, position)[:page_size + 1])
+        return self.finish_page(rows, page_size)
+
+    def finish_page(self, rows, page_size):
+        """
+        Trim the look-ahead row and remember where the next page starts.
+        """
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_position = self.get_position(rows[-1]) if self.has_next else None
+        return rows
+
+    @staticmethod
+    def get_position(row):
+        if isinstance(row, dict):
+            return row['date'], row['id']
+        return row.date, row.id
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            value = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            last_date, last_id = value.split('|')
+            return date.fromisoformat(last_date), int(last_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def encode_cursor(position):
+        last_date, last_id = position
+        return base64.urlsafe_b64encode(f'{last_date.isoformat()}|{last_id}'.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.next_position:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
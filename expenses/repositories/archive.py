@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import ArchivedExpense, Expense
+
+
+class ExpenseArchiveRepository:
+    # Columns in table order, shared by both tables
+    FIELDS = [field.attname for field in Expense._meta.concrete_fields]
+
+    @staticmethod
+    def get_cutoff(today=None):
+        """
+        Return the first date kept in the hot table, or None when archiving is off.
+        Every archived expense is dated before it.
+        """
+        days = settings.EXPENSE_ARCHIVE_AFTER_DAYS
+        if days is None:
+            return None
+        return (today or date.today()) - timedelta(days=days)
+
+    @staticmethod
+    def reaches_archive(start_date=None):
+        """
+        Whether a range starting at start_date (None for all time) may include archived expenses.
+        """
+        cutoff = ExpenseArchiveRepository.get_cutoff()
+        if cutoff is None:
+            return False
+        return start_date is None or Expense._meta.get_field('date').to_python(start_date) < cutoff
+
+    @staticmethod
+    def get_sources(start_date=None):
+        """
+        Return the models holding expenses dated start_date or later.
+        """
+        if ExpenseArchiveRepository.reaches_archive(start_date):
+            return [Expense, ArchivedExpense]
+        return [Expense]
+
+    @staticmethod
+    def merge_totals(rows, key_fields):
+        """
+        Add up {total, count} rows sharing the same key fields, such as the
+        per-table aggregates of the hot table and the archive.
+        """
+        merged = {}
+        for row in rows:
+            key = tuple(row[field] for field in key_fields)
+            total, count = merged.get(key, (0, 0))
+            merged[key] = (total + row['total'], count + row['count'])
+        return [
+            {**dict(zip(key_fields, key)), 'total': total, 'count': count}
+            for key, (total, count) in merged.items()
+        ]
+
+    @staticmethod
+    def archive_before(cutoff, batch_size=1000):
+        """
+        Move expenses dated before cutoff into the archive, one transaction per batch.
+        The rollups are left as they are, since the amounts still count.
+        Returns the number of expenses moved and the IDs of their owners.
+        """
+        fields = ExpenseArchiveRepository.FIELDS
+        moved = 0
+        user_ids = set()
+        while True:
+            with transaction.atomic():
+                rows = list(Expense.objects.filter(date__lt=cutoff).order_by('id').values(*fields)[:batch_size])
+                if not rows:
+                    return moved, user_ids
+                ArchivedExpense.objects.bulk_create(ArchivedExpense(**row) for row in rows)
+                Expense.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            moved += len(rows)
+            user_ids.update(row['user_id'] for row in rows)
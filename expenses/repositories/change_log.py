@@ -0,0 +1,69 @@
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from ..models import Expense, ExpenseChangeLog
+
+
+class ExpenseChangeLogRepository:
+    @staticmethod
+    def build_entries(expenses, op):
+        """
+        Snapshot the owner and date of expenses about to change.
+        Call before modifying them, or after inserting them for creates; save the entries
+        with save_entries in the same transaction.
+        """
+        changed_at = timezone.now()
+        date_field = Expense._meta.get_field('date')
+        return [
+            ExpenseChangeLog(
+                expense_id=expense.id, user_id=expense.user_id,
+                date=date_field.to_python(expense.date), op=op, changed_at=changed_at,
+            )
+            for expense in expenses
+        ]
+
+    @staticmethod
+    def save_entries(entries):
+        ExpenseChangeLog.objects.bulk_create(entries)
+
+    @staticmethod
+    def get_changes_since(since):
+        """
+        Return change log entries recorded after `since`, or every entry when it is None.
+        """
+        query = ExpenseChangeLog.objects.all()
+        if since is not None:
+            query = query.filter(changed_at__gt=since)
+        return query
+
+    @staticmethod
+    def get_user_changes(after, limit, user=None, admin=False):
+        """
+        Return up to `limit` change log rows after sequence number `after`, in sequence order.
+        If admin, include every user's changes.
+        """
+        query = ExpenseChangeLog.objects.filter(id__gt=after)
+        if not admin:
+            query = query.filter(user_id=user.id)
+        return list(query.order_by('id').values('id', 'expense_id', 'op')[:limit])
+
+    @staticmethod
+    def get_last_sequence():
+        return ExpenseChangeLog.objects.aggregate(last=Max('id'))['last'] or 0
+
+    @staticmethod
+    def get_first_sequence():
+        """
+        Return the oldest retained sequence number, or None when the log is empty.
+        """
+        return ExpenseChangeLog.objects.aggregate(first=Min('id'))['first']
+
+    @staticmethod
+    def purge_before(cutoff):
+        """
+        Delete entries recorded before cutoff. Returns the number deleted.
+        The newest entry is always kept, so get_first_sequence marks where the purge stopped.
+        """
+        last = ExpenseChangeLogRepository.get_last_sequence()
+        deleted, _ = ExpenseChangeLog.objects.filter(changed_at__lt=cutoff, id__lt=last).delete()
+        return deleted
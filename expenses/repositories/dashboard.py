@@ -0,0 +1,158 @@
+from datetime import date
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from ..models import AdminTopExpense, Expense, ExpenseChangeLog, ExpenseMonthlySummary, SummaryRefreshState
+from .archive import ExpenseArchiveRepository
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+class AdminDashboardRepository:
+    STATE_NAME = 'admin_dashboard'
+    TOP_EXPENSE_FIELDS = ('id', 'title', 'amount', 'category', 'date', 'user_id')
+
+    @staticmethod
+    def get_state(lock=False):
+        """
+        Return the refresh state row, locking it for the transaction when asked.
+        """
+        query = SummaryRefreshState.objects
+        if lock:
+            query = query.select_for_update()
+        state, _ = query.get_or_create(name=AdminDashboardRepository.STATE_NAME)
+        return state
+
+    @staticmethod
+    def save_state(state, watermark, refreshed_at):
+        state.watermark = watermark
+        state.refreshed_at = refreshed_at
+        state.save(update_fields=['watermark', 'refreshed_at'])
+
+    @staticmethod
+    def get_changed_partitions(since, change_log):
+        """
+        Return the (user_id, month) partitions touched after `since`: months with new
+        expenses, and the old and current months of updated or deleted ones.
+        """
+        created = (
+            Expense.objects.filter(created_at__gt=since)
+            .annotate(month=TruncMonth('date'))
+            .values_list('user_id', 'month').distinct()
+        )
+        partitions = set(created)
+        partitions.update((entry.user_id, month_start(entry.date)) for entry in change_log)
+
+        updated_ids = {entry.expense_id for entry in change_log if entry.op == ExpenseChangeLog.UPDATE}
+        if updated_ids:
+            current = Expense.objects.filter(id__in=updated_ids).values_list('user_id', 'date')
+            partitions.update((user_id, month_start(day)) for user_id, day in current)
+        return partitions
+
+    @staticmethod
+    def refresh_partitions(partitions):
+        """
+        Recompute the monthly summaries of the given (user_id, month) partitions.
+        Months reaching back before the archive cutoff also count archived expenses.
+        """
+        summaries = []
+        for user_id, month in partitions:
+            rows = []
+            for model in ExpenseArchiveRepository.get_sources(month):
+                rows.extend(
+                    model.objects.filter(user_id=user_id, date__gte=month, date__lt=next_month(month))
+                    .values('category').annotate(total=Sum('amount'), count=Count('id'))
+                )
+            summaries.extend(
+                ExpenseMonthlySummary(user_id=user_id, month=month, **row)
+                for row in ExpenseArchiveRepository.merge_totals(rows, ['category'])
+            )
+            ExpenseMonthlySummary.objects.filter(user_id=user_id, month=month).delete()
+        ExpenseMonthlySummary.objects.bulk_create(summaries)
+        return len(summaries)
+
+    @staticmethod
+    def refresh_all():
+        """
+        Rebuild every monthly summary with one grouped scan of the expenses, and one
+        of the archive when archiving is on.
+        """
+        rows = []
+        for model in ExpenseArchiveRepository.get_sources():
+            rows.extend(
+                model.objects.annotate(month=TruncMonth('date'))
+                .values('user_id', 'month', 'category')
+                .annotate(total=Sum('amount'), count=Count('id'))
+                .order_by().iterator()
+            )
+        ExpenseMonthlySummary.objects.all().delete()
+        totals = ExpenseArchiveRepository.merge_totals(rows, ['user_id', 'month', 'category'])
+        summaries = ExpenseMonthlySummary.objects.bulk_create(
+            (ExpenseMonthlySummary(**row) for row in totals), batch_size=1000
+        )
+        return len(summaries)
+
+    @staticmethod
+    def refresh_top_expenses(limit, since=None, change_log=()):
+        """
+        Refresh the top `limit` expenses by amount, archived ones included. Without a
+        watermark, or when a ranked expense was updated or deleted, the ranking is rebuilt
+        from both tables; otherwise only expenses added or updated since the watermark
+        compete with it. Archiving keeps ids and amounts, so it never invalidates a rank.
+        """
+        fields = AdminDashboardRepository.TOP_EXPENSE_FIELDS
+        ranked = list(AdminTopExpense.objects.values_list('expense_id', *fields[1:]))
+        ranked_ids = {row[0] for row in ranked}
+        changed_ids = {entry.expense_id for entry in change_log}
+        if since is None or len(ranked_ids) < limit or changed_ids & ranked_ids:
+            queries = [model.objects.values_list(*fields) for model in ExpenseArchiveRepository.get_sources()]
+            if len(queries) > 1:
+                queries = [queries[0].union(*queries[1:], all=True)]
+            top = list(queries[0].order_by('-amount', '-id')[:limit])
+        else:
+            updated_ids = changed_ids - {e.expense_id for e in change_log if e.op == ExpenseChangeLog.DELETE}
+            # Ranked expenses created within the refresh overlap match again; keep their row
+            candidates = Expense.objects.filter(Q(created_at__gt=since) | Q(id__in=updated_ids)).exclude(
+                id__in=ranked_ids
+            )
+            top = ranked + list(candidates.order_by('-amount', '-id').values_list(*fields)[:limit])
+            top = sorted(top, key=lambda row: (row[2], row[0]), reverse=True)[:limit]
+
+        AdminTopExpense.objects.all().delete()
+        AdminTopExpense.objects.bulk_create(
+            AdminTopExpense(rank=rank, expense_id=row[0], **dict(zip(fields[1:], row[1:])))
+            for rank, row in enumerate(top, start=1)
+        )
+        return len(top)
+
+    @staticmethod
+    def get_category_totals():
+        return (
+            ExpenseMonthlySummary.objects.values('category')
+            .annotate(total=Sum('total'), count=Sum('count')).order_by('-total')
+        )
+
+    @staticmethod
+    def get_monthly_totals():
+        return (
+            ExpenseMonthlySummary.objects.values('month')
+            .annotate(total=Sum('total'), count=Sum('count')).order_by('month')
+        )
+
+    @staticmethod
+    def get_user_totals(limit):
+        return (
+            ExpenseMonthlySummary.objects.values('user_id', 'user__username')
+            .annotate(total=Sum('total'), count=Sum('count')).order_by('-total')[:limit]
+        )
+
+    @staticmethod
+    def get_top_expenses():
+        return AdminTopExpense.objects.select_related('user').order_by('rank')
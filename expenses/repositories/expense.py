@@ -1,31 +1,54 @@
+from datetime import date, timedelta
+
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Count, Sum
 from django.db.models.functions import TruncMonth, TruncWeek
 
-from ..models import Expense
+from expense_tracker.db import get_read_alias
+
+from ..fields import minor_units_text
+from ..models import Expense, ExpenseChangeLog
+from .archive import ExpenseArchiveRepository
+from .change_log import ExpenseChangeLogRepository
+from .rollup import ExpenseRollupRepository
 
 
 class ExpenseRepository:
+    # Columns loaded for each read use case, so rows carry only what is rendered
+    LIST_FIELDS = ('id', 'title', 'amount', 'category', 'date', 'created_at', 'updated_at', 'user_id')
+    # Expenses loaded for writing also carry the derived columns save() keeps in sync
+    DETAIL_FIELDS = LIST_FIELDS + ('category_normalized',)
+    # Exported amounts are decimal strings built from the stored minor units
+    EXPORT_FIELDS = ('title', 'amount_text', 'category', 'date')
+
     @staticmethod
     def create_expense(data):
         """
-        Save an expense to the database.
+        Save an expense to the database and add it to the rollups and the change log.
         """
-        return Expense.objects.create(**data)
+        with transaction.atomic():
+            expense = Expense.objects.create(**data)
+            ExpenseRollupRepository.apply_deltas(ExpenseRollupRepository.add_delta({}, expense))
+            ExpenseChangeLogRepository.save_entries(
+                ExpenseChangeLogRepository.build_entries([expense], ExpenseChangeLog.CREATE)
+            )
+        return expense
     
     @staticmethod
     def get_all_expenses():
         """
-        Retrieve all expenses.
+        Retrieve all expenses, newest first.
         """
-        return Expense.objects.all()
+        return Expense.objects.only(*ExpenseRepository.LIST_FIELDS).order_by('-date', '-id')
 
     @staticmethod
     def get_user_expenses(user):
         """
-        Retrieve expenses for a specific user.
+        Retrieve expenses for a specific user, newest first.
         """
-        return Expense.objects.filter(user=user)
+        return Expense.objects.filter(user=user).only(*ExpenseRepository.LIST_FIELDS).order_by('-date', '-id')
     
     @staticmethod
     def get_expense_by_id(expense_id, user=None, admin=False):
@@ -33,85 +56,247 @@ class ExpenseRepository:
         Retrieve an expense by ID.
         If admin, ignore the user filter.
         """
+        query = Expense.objects.only(*ExpenseRepository.DETAIL_FIELDS)
         if admin:
-            return get_object_or_404(Expense, id=expense_id)
-        return get_object_or_404(Expense, id=expense_id, user=user)
+            return get_object_or_404(query, id=expense_id)
+        return get_object_or_404(query, id=expense_id, user=user)
 
     @staticmethod
     def update_expense(expense, data):
         """
         Update an expense with the given data.
+        The rollups move the amount when the category, date or amount changes.
         """
+        deltas = ExpenseRollupRepository.add_delta({}, expense, sign=-1)
+        log_entries = ExpenseChangeLogRepository.build_entries([expense], ExpenseChangeLog.UPDATE)
         for field, value in data.items():
             setattr(expense, field, value)
-        expense.save()
+        with transaction.atomic():
+            expense.save()
+            ExpenseRollupRepository.apply_deltas(ExpenseRollupRepository.add_delta(deltas, expense))
+            ExpenseChangeLogRepository.save_entries(log_entries)
         return expense
 
     @staticmethod
     def delete_expense(expense):
         """
-        Delete the given expense.
+        Delete the given expense and remove it from the rollups.
         """
-        expense.delete()
+        deltas = ExpenseRollupRepository.add_delta({}, expense, sign=-1)
+        log_entries = ExpenseChangeLogRepository.build_entries([expense], ExpenseChangeLog.DELETE)
+        with transaction.atomic():
+            expense.delete()
+            ExpenseRollupRepository.apply_deltas(deltas)
+            ExpenseChangeLogRepository.save_entries(log_entries)
 
     @staticmethod
-    def get_expenses_by_date_range(start_date, end_date, user=None, admin=False):
+    def get_expenses_by_ids(expense_ids, user=None, admin=False):
         """
-        Retrieve expenses within a date range.
+        Retrieve the expenses with the given IDs.
         If admin, ignore the user filter.
         """
-        query = Expense.objects.filter(date__range=[start_date, end_date])
+        query = Expense.objects.filter(id__in=expense_ids).only(*ExpenseRepository.DETAIL_FIELDS)
         if not admin:
             query = query.filter(user=user)
         return query
 
+    @staticmethod
+    def bulk_create_expenses(data_list, batch_size=None):
+        """
+        Insert many expenses in batches inside one transaction and add them to the rollups.
+        """
+        expenses = [Expense(**data) for data in data_list]
+        deltas = {}
+        for expense in expenses:
+            # bulk_create() does not call save(), so derived columns are set here
+            expense.category_normalized = Expense.normalize_category(expense.category)
+            ExpenseRollupRepository.add_delta(deltas, expense)
+        with transaction.atomic():
+            Expense.objects.bulk_create(expenses, batch_size=batch_size)
+            ExpenseRollupRepository.apply_deltas(deltas)
+            # The ids are only known once the rows are inserted
+            ExpenseChangeLogRepository.save_entries(
+                ExpenseChangeLogRepository.build_entries(expenses, ExpenseChangeLog.CREATE)
+            )
+        return expenses
+
+    @staticmethod
+    def bulk_update_expenses(expenses, changes, batch_size=None):
+        """
+        Apply {expense_id: data} changes to the given expenses in batches inside one transaction.
+        The rollups move the amounts of every changed expense.
+        """
+        deltas = {}
+        fields = set()
+        log_entries = ExpenseChangeLogRepository.build_entries(expenses, ExpenseChangeLog.UPDATE)
+        for expense in expenses:
+            ExpenseRollupRepository.add_delta(deltas, expense, sign=-1)
+            for field, value in changes[expense.id].items():
+                setattr(expense, field, value)
+                fields.add(field)
+            expense.category_normalized = Expense.normalize_category(expense.category)
+            ExpenseRollupRepository.add_delta(deltas, expense)
+        if not fields:
+            return expenses
+        if 'category' in fields:
+            fields.add('category_normalized')
+        # bulk_update() skips auto_now, so the sync feed's updated_at is set here
+        updated_at = timezone.now()
+        for expense in expenses:
+            expense.updated_at = updated_at
+        fields.add('updated_at')
+        with transaction.atomic():
+            Expense.objects.bulk_update(expenses, fields, batch_size=batch_size)
+            ExpenseRollupRepository.apply_deltas(deltas)
+            ExpenseChangeLogRepository.save_entries(log_entries)
+        return expenses
+
+    @staticmethod
+    def bulk_delete_expenses(expenses):
+        """
+        Delete the given expenses in one statement and remove them from the rollups.
+        """
+        deltas = {}
+        for expense in expenses:
+            ExpenseRollupRepository.add_delta(deltas, expense, sign=-1)
+        log_entries = ExpenseChangeLogRepository.build_entries(expenses, ExpenseChangeLog.DELETE)
+        with transaction.atomic():
+            _, deleted = Expense.objects.filter(id__in=[expense.id for expense in expenses]).delete()
+            ExpenseRollupRepository.apply_deltas(deltas)
+            ExpenseChangeLogRepository.save_entries(log_entries)
+        return deleted.get(Expense._meta.label, 0)
+
+    @staticmethod
+    def backfill_normalized_categories(batch_size=1000, using='default'):
+        """
+        Fill category_normalized on rows written before the column existed.
+        """
+        query = Expense.objects.using(using).filter(category_normalized='').exclude(category='')
+        updated = 0
+        while True:
+            expenses = list(query.only('id', 'category')[:batch_size])
+            if not expenses:
+                return updated
+            for expense in expenses:
+                expense.category_normalized = Expense.normalize_category(expense.category)
+            Expense.objects.using(using).bulk_update(expenses, ['category_normalized'])
+            updated += len(expenses)
+
+    @staticmethod
+    def get_sources(start_date=None, user=None, admin=False):
+        """
+        Return one queryset per table holding expenses dated start_date or later
+        (None for all time): the hot table, plus the archive when the range reaches it.
+        These analytics and export reads go to the read replica when one is configured.
+        If admin, ignore the user filter.
+        """
+        queries = []
+        for model in ExpenseArchiveRepository.get_sources(start_date):
+            query = model.objects.using(get_read_alias())
+            if not admin:
+                query = query.filter(user=user)
+            queries.append(query)
+        return queries
+
+    @staticmethod
+    def get_expenses_by_date_range(start_date, end_date, user=None, admin=False):
+        """
+        Retrieve expenses within a date range.
+        Ranges reaching before the archive cutoff read the archive too, as a UNION ALL.
+        If admin, ignore the user filter.
+        """
+        queries = [
+            query.filter(date__range=[start_date, end_date])
+            for query in ExpenseRepository.get_sources(start_date, user=user, admin=admin)
+        ]
+        return ExpenseRepository.union_all(queries)
+
+    @staticmethod
+    def union_all(queries):
+        if len(queries) == 1:
+            return queries[0]
+        return queries[0].union(*queries[1:], all=True)
+
+    @staticmethod
+    def get_export_rows(start_date, end_date, user=None, admin=False):
+        """
+        Retrieve export rows within a date range as tuples.
+        Admin rows carry the owner's username, joined in the same query.
+        """
+        fields = ExpenseRepository.EXPORT_FIELDS
+        if admin:
+            fields += ('user__username',)
+        queries = [
+            query.filter(date__range=[start_date, end_date])
+            .annotate(amount_text=minor_units_text(query.model, 'amount')).values_list(*fields)
+            for query in ExpenseRepository.get_sources(start_date, user=user, admin=admin)
+        ]
+        return ExpenseRepository.union_all(queries)
+
     @staticmethod
     def get_expenses_by_category(user=None, admin=False):
         """
-        Aggregate total expenses per category.
+        Aggregate total expenses per category, archived ones included.
         """
-        query = Expense.objects
-        if not admin:
-            query = query.filter(user=user)
-        return query.values('category').annotate(total=Sum('amount'))
+        rows = []
+        for query in ExpenseRepository.get_sources(user=user, admin=admin):
+            rows.extend(query.values('category').annotate(total=Sum('amount'), count=Count('id')))
+        return ExpenseArchiveRepository.merge_totals(rows, ['category'])
 
     @staticmethod
     def get_monthly_totals(current_year, user=None, admin=False):
         """
         Aggregate total expenses by month for the current year.
         """
-        query = Expense.objects.filter(date__year=current_year)
-        if not admin:
-            query = query.filter(user=user)
-        return query.annotate(month=TruncMonth('date')).values('month').annotate(total=Sum('amount')).order_by('month')
+        start_date = date(current_year, 1, 1)
+        rows = []
+        for query in ExpenseRepository.get_sources(start_date, user=user, admin=admin):
+            rows.extend(
+                query.filter(date__gte=start_date, date__lt=date(current_year + 1, 1, 1))
+                .annotate(month=TruncMonth('date')).values('month')
+                .annotate(total=Sum('amount'), count=Count('id')).order_by('month')
+            )
+        return sorted(ExpenseArchiveRepository.merge_totals(rows, ['month']), key=lambda row: row['month'])
 
     @staticmethod
-    def get_weekly_trends(last_month, user=None, admin=False):
+    def get_weekly_trends(month_start, user=None, admin=False):
         """
-        Aggregate total expenses by week for the last month.
+        Aggregate total expenses by week for the month starting at month_start.
         """
-        query = Expense.objects.filter(date__month=last_month)
-        if not admin:
-            query = query.filter(user=user)
-        return query.annotate(week=TruncWeek('date')).values('week').annotate(total=Sum('amount')).order_by('week')
+        month_end = (month_start + timedelta(days=31)).replace(day=1)
+        rows = []
+        for query in ExpenseRepository.get_sources(month_start, user=user, admin=admin):
+            rows.extend(
+                query.filter(date__gte=month_start, date__lt=month_end).annotate(week=TruncWeek('date')).values('week')
+                .annotate(total=Sum('amount'), count=Count('id')).order_by('week')
+            )
+        return sorted(ExpenseArchiveRepository.merge_totals(rows, ['week']), key=lambda row: row['week'])
 
     @staticmethod
     def get_highest_spending_category(user=None, admin=False):
         """
         Get the category with the highest total spending.
         """
-        return ExpenseRepository.get_expenses_by_category(user=user, admin=admin).order_by('-total').first()
+        categories = ExpenseRepository.get_expenses_by_category(user=user, admin=admin)
+        return max(categories, key=lambda row: row['total'], default=None)
 
     @staticmethod
     def get_highest_single_expense(user=None, admin=False):
         """
-        Get the expense with the highest amount.
+        Get the expense with the highest amount, which may be an ArchivedExpense.
         """
-        query = Expense.objects
-        if not admin:
-            query = query.filter(user=user)
-        return query.order_by('-amount').first()
-    
+        return ExpenseRepository.get_highest_single_expense_query(user=user, admin=admin).first()
 
+    @staticmethod
+    async def aget_highest_single_expense(user=None, admin=False):
+        """
+        Async variant of get_highest_single_expense.
+        """
+        return await ExpenseRepository.get_highest_single_expense_query(user=user, admin=admin).afirst()
 
-   
+    @staticmethod
+    def get_highest_single_expense_query(user=None, admin=False):
+        queries = ExpenseRepository.get_sources(user=user, admin=admin)
+        if len(queries) > 1:
+            queries = [queries[0].union(*queries[1:], all=True)]
+        return queries[0].order_by('-amount')
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from ..models import ExportJob
+
+
+class ExportJobRepository:
+    @staticmethod
+    def get_or_create_active_job(user, scope, key, start_date, end_date):
+        """
+        Return (job, created): the job in progress for the key, or a new pending one.
+        """
+        job = ExportJob.objects.filter(key=key, status__in=ExportJob.ACTIVE_STATUSES).first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    user=user, scope=scope, key=key, start_date=start_date, end_date=end_date
+                )
+            return job, True
+        except IntegrityError:
+            # A concurrent identical request created the job first
+            return ExportJob.objects.get(key=key, status__in=ExportJob.ACTIVE_STATUSES), False
+
+    @staticmethod
+    def get_job(job_id, scope):
+        """
+        Retrieve a job visible to the given scope.
+        """
+        return get_object_or_404(ExportJob, id=job_id, scope=scope)
+
+    @staticmethod
+    def claim_next_job():
+        """
+        Mark the oldest pending job as running and return it, or None when the queue is empty.
+        The conditional UPDATE lets several workers poll the same table without a lock.
+        Jobs running for longer than EXPORT_JOB_TIMEOUT seconds are taken to belong to a
+        stopped worker and go back in the queue first.
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+        ExportJobRepository.requeue_running_jobs(started_before=stale_before)
+        while True:
+            job = ExportJob.objects.filter(status=ExportJob.PENDING).order_by('created_at', 'id').first()
+            if job is None:
+                return None
+            started_at = timezone.now()
+            claimed = ExportJob.objects.filter(id=job.id, status=ExportJob.PENDING).update(
+                status=ExportJob.RUNNING, started_at=started_at
+            )
+            if claimed:
+                job.status = ExportJob.RUNNING
+                job.started_at = started_at
+                return job
+
+    @staticmethod
+    def mark_done(job, file_path, rows):
+        job.status = ExportJob.DONE
+        job.file_path = file_path
+        job.rows = rows
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'file_path', 'rows', 'finished_at'])
+
+    @staticmethod
+    def mark_failed(job, error):
+        job.status = ExportJob.FAILED
+        job.error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+
+    @staticmethod
+    def requeue_running_jobs(started_before=None):
+        """
+        Put jobs left running by a stopped worker back in the queue: every running job,
+        or only those started before started_before.
+        """
+        jobs = ExportJob.objects.filter(status=ExportJob.RUNNING)
+        if started_before is not None:
+            jobs = jobs.filter(started_at__lt=started_before)
+        return jobs.update(status=ExportJob.PENDING, started_at=None)
@@ -0,0 +1,67 @@
+from django.db import connections, models
+
+from ..models import ArchivedExpense, Expense, ExpenseDailyRollup, ExpenseMonthlySummary
+from .search import ExpenseSearchRepository
+
+
+class MoneyStorageRepository:
+    """
+    Converts databases created before amounts were stored as integer minor units.
+    """
+    FIELDS = [
+        (Expense, 'amount'),
+        (ArchivedExpense, 'amount'),
+        (ExpenseDailyRollup, 'total'),
+        (ExpenseMonthlySummary, 'total'),
+    ]
+
+    @staticmethod
+    def get_column_type(connection, model, name):
+        """
+        Return the Django field type the column currently has in the database, or None
+        when the table does not exist yet.
+        """
+        table = model._meta.db_table
+        if table not in connection.introspection.table_names():
+            return None
+        column = model._meta.get_field(name).column
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, table)
+        row = next(row for row in description if row.name == column)
+        return connection.introspection.get_field_type(row.type_code, row)
+
+    @staticmethod
+    def convert(model, name, using='default'):
+        """
+        Scale a decimal column to minor units and change its type to an integer, in one
+        transaction. Returns False when the column needs no conversion.
+        """
+        connection = connections[using]
+        if MoneyStorageRepository.get_column_type(connection, model, name) != 'DecimalField':
+            return False
+
+        field = model._meta.get_field(name)
+        old_field = models.DecimalField(max_digits=field.max_digits, decimal_places=field.decimal_places)
+        old_field.set_attributes_from_name(name)
+        old_field.model = model
+        table = connection.ops.quote_name(model._meta.db_table)
+        column = connection.ops.quote_name(field.column)
+        with connection.schema_editor() as editor:
+            if connection.vendor != 'sqlite':
+                # Make room for the scaled values; SQLite does not enforce decimal precision
+                wide_field = models.DecimalField(
+                    max_digits=field.max_digits + field.decimal_places, decimal_places=field.decimal_places
+                )
+                wide_field.set_attributes_from_name(name)
+                wide_field.model = model
+                editor.alter_field(model, old_field, wide_field)
+                old_field = wide_field
+            editor.execute(
+                f"UPDATE {table} SET {column} = ROUND({column} * %s)", [10 ** field.decimal_places]
+            )
+            editor.alter_field(model, old_field, field)
+
+        if model is Expense:
+            # SQLite rebuilds the table to change a column type, dropping the search triggers
+            ExpenseSearchRepository.install(connection)
+        return True
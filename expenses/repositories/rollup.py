@@ -0,0 +1,154 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Count
+
+from expense_tracker.db import get_read_alias
+
+from ..fields import minor_units
+from ..models import Expense, ExpenseDailyRollup
+from .archive import ExpenseArchiveRepository
+
+
+class ExpenseRollupRepository:
+    @staticmethod
+    def get_key(expense):
+        """
+        Return the rollup key and amount of an expense, in minor units.
+        Values assigned from raw request data are converted to their Python types first.
+        """
+        category = expense.category
+        day = Expense._meta.get_field('date').to_python(expense.date)
+        field = Expense._meta.get_field('amount')
+        return (expense.user_id, category, day), field.to_minor_units(field.to_python(expense.amount))
+
+    @staticmethod
+    def add_delta(deltas, expense, sign=1):
+        """
+        Accumulate the contribution of an expense into a deltas mapping.
+        Use sign=-1 to remove a previously counted expense.
+        """
+        key, amount = ExpenseRollupRepository.get_key(expense)
+        total, count = deltas.get(key, (0, 0))
+        deltas[key] = (total + sign * amount, count + sign)
+        return deltas
+
+    @staticmethod
+    def apply_deltas(deltas):
+        """
+        Apply {(user_id, category, date): (amount, count)} deltas to the rollups,
+        with amounts in minor units. Rows whose count drops to zero are removed.
+        """
+        total_field = ExpenseDailyRollup._meta.get_field('total')
+        with transaction.atomic():
+            for (user_id, category, day), (amount, count) in deltas.items():
+                if not amount and not count:
+                    continue
+                rows = ExpenseDailyRollup.objects.filter(user_id=user_id, category=category, date=day)
+                # The total column holds minor units, so the integer delta is added as it is
+                updated = rows.update(total=F('total') + amount, count=F('count') + count)
+                if not updated:
+                    try:
+                        with transaction.atomic():
+                            ExpenseDailyRollup.objects.create(
+                                user_id=user_id, category=category, date=day,
+                                total=total_field.from_minor_units(amount), count=count,
+                            )
+                    except IntegrityError:
+                        # A concurrent writer created the row first
+                        rows.update(total=F('total') + amount, count=F('count') + count)
+                if count < 0:
+                    rows.filter(count__lte=0).delete()
+
+    @staticmethod
+    def get_daily_category_totals(user=None, admin=False):
+        """
+        Retrieve total expenses per category and day as (category, date, total) tuples,
+        with totals in minor units. Read from the read replica when one is configured.
+        """
+        rollups = ExpenseDailyRollup.objects.using(get_read_alias())
+        if admin:
+            return (
+                rollups.values('category', 'date')
+                .annotate(total_minor=Sum(minor_units('total')))
+                .values_list('category', 'date', 'total_minor')
+            )
+        return rollups.filter(user=user).values_list('category', 'date', minor_units('total'))
+
+    @staticmethod
+    def get_period_totals(start_date, end_date, trunc, user=None, admin=False, by_category=False):
+        """
+        Sum the rollups dated start_date <= date < end_date per period, where `trunc`
+        maps the date column to its period start (e.g. TruncMonth), and per category
+        when asked. The date filter is a plain range so it can use the date indexes.
+        """
+        query = ExpenseDailyRollup.objects.using(get_read_alias()).filter(date__gte=start_date, date__lt=end_date)
+        if not admin:
+            query = query.filter(user=user)
+        fields = ['period', 'category'] if by_category else ['period']
+        return (
+            query.annotate(period=trunc('date')).values(*fields)
+            .annotate(total=Sum('total'), count=Sum('count')).order_by('period')
+        )
+
+    @staticmethod
+    def get_raw_totals(user_ids):
+        """
+        Aggregate the raw expenses of the given users into rollup rows, archived ones
+        included, with totals in minor units.
+        """
+        totals = {}
+        for model in ExpenseArchiveRepository.get_sources():
+            rows = (
+                model.objects.filter(user_id__in=user_ids)
+                .values('user_id', 'category', 'date')
+                .annotate(total=Sum(minor_units('amount')), count=Count('id'))
+            )
+            for row in rows.iterator():
+                key = (row['user_id'], row['category'], row['date'])
+                total, count = totals.get(key, (0, 0))
+                totals[key] = (total + row['total'], count + row['count'])
+        return totals
+
+    @staticmethod
+    def get_rollup_totals(user_ids):
+        """
+        Retrieve the stored rollup rows of the given users, with totals in minor units.
+        """
+        rows = ExpenseDailyRollup.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'category', 'date', minor_units('total'), 'count'
+        )
+        return {
+            (user_id, category, day): (total, count)
+            for user_id, category, day, total, count in rows.iterator()
+        }
+
+    @staticmethod
+    def rebuild(user_ids):
+        """
+        Replace the rollups of the given users with totals recomputed from raw expenses.
+        """
+        totals = ExpenseRollupRepository.get_raw_totals(user_ids)
+        total_field = ExpenseDailyRollup._meta.get_field('total')
+        with transaction.atomic():
+            ExpenseDailyRollup.objects.filter(user_id__in=user_ids).delete()
+            ExpenseDailyRollup.objects.bulk_create([
+                ExpenseDailyRollup(
+                    user_id=user_id, category=category, date=day,
+                    total=total_field.from_minor_units(total), count=count,
+                )
+                for (user_id, category, day), (total, count) in totals.items()
+            ])
+        return len(totals)
+
+    @staticmethod
+    def find_mismatches(user_ids):
+        """
+        Compare the rollups of the given users against the raw expenses.
+        Returns {key: (expected, stored)} for every rollup row that differs.
+        """
+        expected = ExpenseRollupRepository.get_raw_totals(user_ids)
+        stored = ExpenseRollupRepository.get_rollup_totals(user_ids)
+        return {
+            key: (expected.get(key), stored.get(key))
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        }
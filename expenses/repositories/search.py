@@ -0,0 +1,83 @@
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'expenses_expense_fts'
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content='expenses_expense', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+]
+
+POSTGRES_TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS expense_title_trgm_idx ON expenses_expense USING gin (title gin_trgm_ops)",
+]
+
+
+class ExpenseSearchRepository:
+    @staticmethod
+    def install(connection):
+        """
+        Create the title search structures for the database backend.
+        SQLite gets an FTS5 index kept in sync by triggers, PostgreSQL a trigram index.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s", [f'{FTS_TABLE}_ai']
+                )
+                # Table rebuilds during migrations drop the triggers, leaving the index stale
+                stale = cursor.fetchone() is None
+                for sql in SQLITE_FTS_SQL:
+                    cursor.execute(sql)
+                if stale:
+                    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                for sql in POSTGRES_TRIGRAM_SQL:
+                    cursor.execute(sql)
+
+    @staticmethod
+    def build_fts_query(text):
+        """
+        Turn free text into an FTS5 query matching every word as a prefix.
+        Words are quoted so user input cannot inject FTS syntax.
+        """
+        words = re.findall(r'\w+', text)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def search_titles(queryset, text):
+        """
+        Filter the queryset to expenses whose title matches the text.
+        """
+        if connections[queryset.db].vendor == 'sqlite':
+            fts_query = ExpenseSearchRepository.build_fts_query(text)
+            if not fts_query:
+                return queryset.none()
+            return queryset.filter(id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [fts_query]
+            ))
+        # The trigram index on PostgreSQL serves ILIKE '%...%' directly
+        return queryset.filter(title__icontains=text)
@@ -1,4 +1,8 @@
-from rest_framework import serializers
+import datetime
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
 from expenses.models import Expense
 
@@ -6,12 +10,27 @@ from expenses.models import Expense
 class ExpenseCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
-        exclude = ['user']  # Exclude the user field for POST requests
+        exclude = ['user', 'category_normalized']  # Exclude the user field for POST requests
+
+class ExpenseImportSerializer(ExpenseCreateSerializer):
+    # Imported rows may leave the category empty; it is derived from the title afterwards
+    category = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+class ExpenseBulkUpdateSerializer(ExpenseCreateSerializer):
+    id = serializers.IntegerField()
+
+    def validate(self, attrs):
+        """
+        Require the ID even though the other fields are partial.
+        """
+        if 'id' not in attrs:
+            raise serializers.ValidationError({'id': ['This field is required.']})
+        return attrs
 
 class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
-        fields = '__all__'
+        exclude = ['category_normalized']
 
     def to_representation(self, instance):
         """
@@ -23,4 +42,64 @@ class ExpenseSerializer(serializers.ModelSerializer):
         if request and request.user.role != 'admin':
             representation.pop('user', None)
 
-        return representation
\ No newline at end of file
+        return representation
+
+class ExpenseReadSerializer:
+    """
+    Fast read path for expense lists, fed with values() rows instead of model instances.
+    The role-based field set and each field's converter are resolved once per request,
+    so rendering a row is a single dict comprehension.
+    """
+    def __init__(self, request=None):
+        fields = ExpenseSerializer(context={'request': request}).fields
+        include_user = request is None or request.user.role == 'admin'
+        # The user is rendered as its primary key, which values() already returns
+        self.converters = [
+            (name, None if name == 'user' else ExpenseReadSerializer.get_converter(field))
+            for name, field in fields.items()
+            if name != 'user' or include_user
+        ]
+
+    @staticmethod
+    def get_converter(field):
+        """
+        Return the function rendering one value of the field.
+        ISO datetimes skip DRF's per-value timezone lookup; the timezone is resolved once here.
+        """
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if not isinstance(field, serializers.DateTimeField) or output_format is None \
+                or output_format.lower() != ISO_8601:
+            return field.to_representation
+
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+        def to_iso(value):
+            if field_timezone is not None:
+                if timezone.is_aware(value):
+                    value = value.astimezone(field_timezone)
+                else:
+                    value = timezone.make_aware(value, field_timezone)
+            elif timezone.is_aware(value):
+                value = timezone.make_naive(value, datetime.timezone.utc)
+            value = value.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return to_iso
+
+    @property
+    def source_fields(self):
+        """
+        The columns to pass to values().
+        """
+        return [name for name, _ in self.converters]
+
+    def to_representation(self, row):
+        representation = {}
+        for name, convert in self.converters:
+            value = row[name]
+            representation[name] = value if convert is None or value is None else convert(value)
+        return representation
+
+    def serialize_many(self, rows):
+        return [self.to_representation(row) for row in rows]
@@ -0,0 +1,27 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from expenses.models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'status', 'start_date', 'end_date', 'rows', 'error',
+            'created_at', 'started_at', 'finished_at', 'status_url', 'download_url',
+        ]
+
+    def get_status_url(self, job):
+        return reverse('export-job-detail', args=[job.id], request=self.context.get('request'))
+
+    def get_download_url(self, job):
+        """
+        Only finished jobs can be downloaded.
+        """
+        if job.status != ExportJob.DONE:
+            return None
+        return reverse('export-job-download', args=[job.id], request=self.context.get('request'))
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+
+from expenses.models import ExpenseDailyRollup
+from expenses.repositories.expense import ExpenseRepository
+from expenses.repositories.rollup import ExpenseRollupRepository
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ExpenseAnalyticsEngine:
+    @staticmethod
+    def fold(rows, today=None):
+        """
+        Fold (category, date, amount) rows into every analytics summary in a single pass.
+        Rows may be raw expenses or totals already grouped per category and day.
+        """
+        today = today or date.today()
+        current_year = today.year
+        # Compared as a date range so the same month of other years is left out
+        this_month = today.replace(day=1)
+        last_month = (this_month - timedelta(days=1)).replace(day=1)
+
+        categories = {}
+        months = {}
+        weeks = {}
+        for category, day, amount in rows:
+            categories[category] = categories.get(category, 0) + amount
+            if day.year == current_year:
+                month = day.replace(day=1)
+                months[month] = months.get(month, 0) + amount
+            if last_month <= day < this_month:
+                week = day - timedelta(days=day.weekday())
+                weeks[week] = weeks.get(week, 0) + amount
+
+        return {
+            "category_summary": categories,
+            "monthly_summary": dict(sorted(months.items())),
+            "weekly_trends": dict(sorted(weeks.items())),
+            "highest_spending_category": max(categories, key=categories.get) if categories else None,
+        }
+
+    @staticmethod
+    def fold_arrays(rows, today=None):
+        """
+        Same as fold() for integer amounts, summed as NumPy columns instead of row by row.
+        """
+        today = today or date.today()
+        this_month = numpy.datetime64(today.replace(day=1), 'D')
+        last_month = numpy.datetime64((today.replace(day=1) - timedelta(days=1)).replace(day=1), 'D')
+        this_year = numpy.datetime64(today, 'Y')
+
+        count = len(rows)
+        names = {}
+        codes = numpy.fromiter((names.setdefault(name, len(names)) for name, _, _ in rows), numpy.int64, count)
+        # Building datetime64 values from date objects is slow; day ordinals convert in bulk
+        epoch = date(1970, 1, 1).toordinal()
+        days = numpy.fromiter((day.toordinal() - epoch for _, day, _ in rows), numpy.int64, count)
+        days = days.astype('datetime64[D]')
+        amounts = numpy.fromiter((amount for _, _, amount in rows), numpy.int64, count)
+
+        def group(keys, values):
+            # Sums of amounts per distinct key; float64 holds cents exactly up to 2**53
+            unique, inverse = numpy.unique(keys, return_inverse=True)
+            return unique, numpy.bincount(inverse, weights=values, minlength=len(unique)).astype(numpy.int64)
+
+        category_totals = numpy.bincount(codes, weights=amounts, minlength=len(names)).astype(numpy.int64)
+        categories = dict(zip(names, category_totals.tolist()))
+
+        in_year = days.astype('datetime64[Y]') == this_year
+        month_keys, month_totals = group(days[in_year].astype('datetime64[M]'), amounts[in_year])
+        months = dict(zip(month_keys.astype('datetime64[D]').tolist(), month_totals.tolist()))
+
+        in_last_month = (days >= last_month) & (days < this_month)
+        last_days = days[in_last_month]
+        # 1970-01-01 was a Thursday, so a day number plus 3 modulo 7 is its weekday
+        weekdays = (last_days.astype(numpy.int64) + 3) % 7
+        week_keys, week_totals = group(last_days - weekdays.astype('timedelta64[D]'), amounts[in_last_month])
+        weeks = dict(zip(week_keys.tolist(), week_totals.tolist()))
+
+        return {
+            "category_summary": categories,
+            "monthly_summary": months,
+            "weekly_trends": weeks,
+            "highest_spending_category": max(categories, key=categories.get) if categories else None,
+        }
+
+    @staticmethod
+    def to_money(summaries):
+        """
+        Turn the minor unit totals of folded summaries into Decimal amounts.
+        """
+        to_decimal = ExpenseDailyRollup._meta.get_field('total').from_minor_units
+        for name in ("category_summary", "monthly_summary", "weekly_trends"):
+            summaries[name] = {key: to_decimal(total) for key, total in summaries[name].items()}
+        return summaries
+
+    @staticmethod
+    def compute(user=None, admin=False, today=None):
+        """
+        Compute the analytics summaries from the daily rollups plus one index lookup
+        for the highest single expense. Totals are summed in minor units, as NumPy
+        columns when NumPy is installed, and only the results become Decimal.
+        """
+        rows = ExpenseRollupRepository.get_daily_category_totals(user=user, admin=admin)
+        if numpy is not None:
+            summaries = ExpenseAnalyticsEngine.fold_arrays(list(rows), today=today)
+        else:
+            summaries = ExpenseAnalyticsEngine.fold(rows.iterator(), today=today)
+        summaries = ExpenseAnalyticsEngine.to_money(summaries)
+        summaries["highest_single_expense"] = ExpenseRepository.get_highest_single_expense(user=user, admin=admin)
+        return summaries
+
+    @staticmethod
+    async def acompute(user=None, admin=False, today=None):
+        """
+        Async variant of compute, reading the rollups and the highest expense with the
+        async ORM. The fold itself is in-memory work and runs on the event loop.
+        """
+        rows = ExpenseRollupRepository.get_daily_category_totals(user=user, admin=admin)
+        rows = [row async for row in rows]
+        if numpy is not None:
+            summaries = ExpenseAnalyticsEngine.fold_arrays(rows, today=today)
+        else:
+            summaries = ExpenseAnalyticsEngine.fold(rows, today=today)
+        summaries = ExpenseAnalyticsEngine.to_money(summaries)
+        summaries["highest_single_expense"] = await ExpenseRepository.aget_highest_single_expense(
+            user=user, admin=admin
+        )
+        return summaries
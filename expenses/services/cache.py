@@ -0,0 +1,153 @@
+import secrets
+import threading
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class AnalyticsCache:
+    """
+    Caches analytics payloads per user, plus one shared entry for admins.
+    Entries expire after ANALYTICS_CACHE_TIMEOUT seconds and are dropped on
+    every write that touches the user's expenses. Keys include the date, since
+    the weekly and monthly figures move with it.
+    """
+    ADMIN_KEY = 'analytics:admin'
+
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def get_cache():
+        return caches[settings.ANALYTICS_CACHE_ALIAS]
+
+    @staticmethod
+    def get_key(user_id=None, admin=False):
+        key = AnalyticsCache.ADMIN_KEY if admin else f'analytics:user:{user_id}'
+        return f'{key}:{date.today().isoformat()}'
+
+    @staticmethod
+    def get_or_compute(user, admin, compute):
+        """
+        Return the cached analytics of the user, computing and storing them on a miss.
+        """
+        cache = AnalyticsCache.get_cache()
+        key = AnalyticsCache.get_key(user.id, admin)
+        payload = cache.get(key, version=settings.ANALYTICS_CACHE_VERSION)
+        if payload is not None:
+            AnalyticsCache._record(hit=True)
+            return payload
+
+        AnalyticsCache._record(hit=False)
+        payload = compute()
+        cache.set(key, payload, timeout=settings.ANALYTICS_CACHE_TIMEOUT, version=settings.ANALYTICS_CACHE_VERSION)
+        return payload
+
+    @staticmethod
+    async def aget_or_compute(user, admin, compute):
+        """
+        Async variant of get_or_compute; compute returns an awaitable.
+        """
+        cache = AnalyticsCache.get_cache()
+        key = AnalyticsCache.get_key(user.id, admin)
+        payload = await cache.aget(key, version=settings.ANALYTICS_CACHE_VERSION)
+        if payload is not None:
+            AnalyticsCache._record(hit=True)
+            return payload
+
+        AnalyticsCache._record(hit=False)
+        payload = await compute()
+        await cache.aset(
+            key, payload, timeout=settings.ANALYTICS_CACHE_TIMEOUT, version=settings.ANALYTICS_CACHE_VERSION
+        )
+        return payload
+
+    @staticmethod
+    def invalidate(user_ids):
+        """
+        Drop the cached analytics of the given users and the admin-wide entry.
+        """
+        keys = [AnalyticsCache.get_key(user_id) for user_id in user_ids]
+        keys.append(AnalyticsCache.get_key(admin=True))
+        AnalyticsCache.get_cache().delete_many(keys, version=settings.ANALYTICS_CACHE_VERSION)
+
+    @staticmethod
+    def _record(hit):
+        with AnalyticsCache._lock:
+            if hit:
+                AnalyticsCache._hits += 1
+            else:
+                AnalyticsCache._misses += 1
+
+    @staticmethod
+    def get_stats():
+        """
+        Return the hit and miss counters of this process.
+        """
+        with AnalyticsCache._lock:
+            return {'hits': AnalyticsCache._hits, 'misses': AnalyticsCache._misses}
+
+    @staticmethod
+    def reset_stats():
+        with AnalyticsCache._lock:
+            AnalyticsCache._hits = 0
+            AnalyticsCache._misses = 0
+
+
+class ExpenseVersionCache:
+    """
+    Version tokens of each user's expenses, plus one for the admin-wide view, used
+    to build ETags. Every write replaces the tokens of the users it touches. A token
+    missing from the cache is recreated with a fresh value, so an eviction can only
+    turn a 304 into a 200, never the reverse. Use a cache shared by all processes:
+    a process that misses a write keeps serving 304s until its copy expires after
+    EXPENSE_VERSION_TIMEOUT seconds.
+    """
+    ADMIN_KEY = 'expense_version:admin'
+
+    @staticmethod
+    def get_cache():
+        return caches[settings.EXPENSE_VERSION_CACHE_ALIAS]
+
+    @staticmethod
+    def get_key(user_id=None, admin=False):
+        if admin:
+            return ExpenseVersionCache.ADMIN_KEY
+        return f'expense_version:user:{user_id}'
+
+    @staticmethod
+    def new_version():
+        """
+        Return a (token, modified timestamp) pair. Tokens are random rather than
+        incremented, so concurrent writers never produce the same one.
+        """
+        return secrets.token_hex(8), time.time()
+
+    @staticmethod
+    def get(user_id=None, admin=False):
+        """
+        Return the current (token, modified timestamp) of the user's expenses, or of
+        every expense when admin.
+        """
+        cache = ExpenseVersionCache.get_cache()
+        key = ExpenseVersionCache.get_key(user_id, admin)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, ExpenseVersionCache.new_version(), timeout=settings.EXPENSE_VERSION_TIMEOUT)
+            version = cache.get(key) or ExpenseVersionCache.new_version()
+        return version
+
+    @staticmethod
+    def bump(user_ids):
+        """
+        Give the given users, and the admin-wide view, new versions.
+        """
+        version = ExpenseVersionCache.new_version()
+        keys = [ExpenseVersionCache.get_key(user_id) for user_id in user_ids]
+        keys.append(ExpenseVersionCache.ADMIN_KEY)
+        ExpenseVersionCache.get_cache().set_many(
+            {key: version for key in keys}, timeout=settings.EXPENSE_VERSION_TIMEOUT
+        )
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from expenses.repositories.change_log import ExpenseChangeLogRepository
+from expenses.repositories.dashboard import AdminDashboardRepository
+
+
+class AdminDashboardService:
+    """
+    Admin dashboards over all users, read from summaries materialized per
+    (user, month, category) and refreshed incrementally from a watermark.
+    """
+
+    @staticmethod
+    def refresh(full=False):
+        """
+        Fold expenses created or changed since the last refresh into the summaries,
+        or rebuild them all. Returns the refresh state.
+        """
+        started = timezone.now()
+        top_n = settings.ADMIN_DASHBOARD_TOP_N
+        with transaction.atomic():
+            state = AdminDashboardRepository.get_state(lock=True)
+            since = None if full else state.watermark
+            if since is None:
+                AdminDashboardRepository.refresh_all()
+                AdminDashboardRepository.refresh_top_expenses(top_n)
+            else:
+                change_log = list(ExpenseChangeLogRepository.get_changes_since(since))
+                partitions = AdminDashboardRepository.get_changed_partitions(since, change_log)
+                AdminDashboardRepository.refresh_partitions(partitions)
+                AdminDashboardRepository.refresh_top_expenses(top_n, since, change_log)
+            # Writes that committed just before `started` may carry an earlier timestamp,
+            # so the next refresh looks back a little further; folding a row twice is harmless.
+            watermark = started - timedelta(seconds=settings.ADMIN_DASHBOARD_REFRESH_OVERLAP)
+            AdminDashboardRepository.save_state(state, watermark, started)
+        return state
+
+    @staticmethod
+    def get_dashboard():
+        state = AdminDashboardRepository.get_state()
+        max_age = timedelta(seconds=settings.ADMIN_DASHBOARD_MAX_STALENESS)
+        if state.refreshed_at is None or timezone.now() - state.refreshed_at > max_age:
+            state = AdminDashboardService.refresh()
+
+        return {
+            "refreshed_at": state.refreshed_at,
+            "category_totals": list(AdminDashboardRepository.get_category_totals()),
+            "monthly_totals": list(AdminDashboardRepository.get_monthly_totals()),
+            "top_users": [
+                {"user_id": row["user_id"], "username": row["user__username"], "total": row["total"], "count": row["count"]}
+                for row in AdminDashboardRepository.get_user_totals(settings.ADMIN_DASHBOARD_TOP_N)
+            ],
+            "top_expenses": [
+                {
+                    "id": top.expense_id, "title": top.title, "amount": top.amount,
+                    "category": top.category, "date": top.date, "username": top.user.username,
+                }
+                for top in AdminDashboardRepository.get_top_expenses()
+            ],
+        }
@@ -1,12 +1,33 @@
 
 import csv
 from io import StringIO
-from datetime import date, timedelta
+from datetime import date
+
+from django.conf import settings
 
 from expenses.repositories.expense import ExpenseRepository
+from expenses.services.analytics import ExpenseAnalyticsEngine
+from expenses.services.cache import AnalyticsCache, ExpenseVersionCache
+
+
+class EchoBuffer:
+    """
+    File-like object that hands back whatever is written to it, so a csv.writer
+    can produce one line at a time for a streaming response.
+    """
+    def write(self, value):
+        return value
 
 
 class ExpenseService:
+    @staticmethod
+    def expenses_changed(user_ids):
+        """
+        Drop the cached analytics and move the ETag versions of users whose expenses changed.
+        """
+        AnalyticsCache.invalidate(user_ids)
+        ExpenseVersionCache.bump(user_ids)
+
     @staticmethod
     def create_expense(data, user):
         """
@@ -15,7 +36,9 @@ class ExpenseService:
         # Add the user to the data
         data['user'] = user
         # Call the repository to save the expense
-        return ExpenseRepository.create_expense(data)
+        expense = ExpenseRepository.create_expense(data)
+        ExpenseService.expenses_changed([expense.user_id])
+        return expense
     
     @staticmethod
     def get_expenses(user):
@@ -40,7 +63,10 @@ class ExpenseService:
         Update an expense after validating permissions.
         """
         expense = ExpenseService.get_expense(expense_id, user)
-        return ExpenseRepository.update_expense(expense, data)
+        owner_id = expense.user_id
+        expense = ExpenseRepository.update_expense(expense, data)
+        ExpenseService.expenses_changed({owner_id, expense.user_id})
+        return expense
 
     @staticmethod
     def delete_expense(expense_id, user):
@@ -48,9 +74,50 @@ class ExpenseService:
         Delete an expense after validating permissions.
         """
         expense = ExpenseService.get_expense(expense_id, user)
+        owner_id = expense.user_id
         ExpenseRepository.delete_expense(expense)
+        ExpenseService.expenses_changed([owner_id])
         return {"message": "Expense deleted successfully!"}
 
+    @staticmethod
+    def get_expenses_by_ids(expense_ids, user):
+        """
+        Retrieve expenses by ID as an {id: expense} mapping, considering the user's role.
+        IDs the user may not access are left out.
+        """
+        admin = user.role == 'admin'
+        expenses = ExpenseRepository.get_expenses_by_ids(expense_ids, user=user, admin=admin)
+        return {expense.id: expense for expense in expenses}
+
+    @staticmethod
+    def bulk_create_expenses(data_list, user):
+        """
+        Create many expenses for the user in one transaction.
+        """
+        for data in data_list:
+            data['user'] = user
+        expenses = ExpenseRepository.bulk_create_expenses(data_list, batch_size=settings.BULK_BATCH_SIZE)
+        ExpenseService.expenses_changed([user.id])
+        return expenses
+
+    @staticmethod
+    def bulk_update_expenses(expenses, changes):
+        """
+        Apply {expense_id: data} changes to already permission-checked expenses.
+        """
+        expenses = ExpenseRepository.bulk_update_expenses(expenses, changes, batch_size=settings.BULK_BATCH_SIZE)
+        ExpenseService.expenses_changed({expense.user_id for expense in expenses})
+        return expenses
+
+    @staticmethod
+    def bulk_delete_expenses(expenses):
+        """
+        Delete already permission-checked expenses.
+        """
+        deleted = ExpenseRepository.bulk_delete_expenses(expenses)
+        ExpenseService.expenses_changed({expense.user_id for expense in expenses})
+        return {"message": f"{deleted} expenses deleted successfully!", "deleted": deleted}
+
     @staticmethod
     def validate_date_range(start_date, end_date):
         """
@@ -58,76 +125,127 @@ class ExpenseService:
         """
         if not start_date or not end_date:
             raise ValueError("Both start_date and end_date are required.")
+        try:
+            date.fromisoformat(start_date)
+            date.fromisoformat(end_date)
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format.")
 
     @staticmethod
     def get_expenses_for_export(start_date, end_date, user, admin):
         """
-        Fetch expenses for the given date range and user context.
+        Fetch export rows for the given date range and user context.
         """
-        return ExpenseRepository.get_expenses_by_date_range(
+        return ExpenseRepository.get_export_rows(
             start_date=start_date, end_date=end_date, user=user, admin=admin
         )
 
+    @staticmethod
+    def get_csv_header(include_user=False):
+        """
+        Return the header row of the CSV export.
+        """
+        if include_user:
+            return ['Title', 'Amount', 'Category', 'Date', 'User']
+        return ['Title', 'Amount', 'Category', 'Date']
+
     @staticmethod
     def generate_csv(expenses, include_user=False):
         """
-        Generate a CSV from the provided expenses.
+        Generate a CSV from the provided export rows.
         """
         # Use StringIO to write to an in-memory string buffer
         output = StringIO()
         writer = csv.writer(output)
 
         # Write the header row
-        if include_user:
-            writer.writerow(['Title', 'Amount', 'Category', 'Date', 'User'])
-        else:
-            writer.writerow(['Title', 'Amount', 'Category', 'Date'])
+        writer.writerow(ExpenseService.get_csv_header(include_user))
 
         # Write the expense rows
-        for expense in expenses:
-            row = [expense.title, expense.amount, expense.category, expense.date]
-            if include_user:
-                row.append(expense.user.username)
-            writer.writerow(row)
+        writer.writerows(expenses)
 
         # Return the CSV content as a string
         return output.getvalue()
 
     @staticmethod
-    def generate_analytics(user):
+    def stream_csv(expenses, include_user=False, chunk_size=None):
         """
-        Generate analytics data.
+        Yield the CSV export line by line, fetching export rows from the database in chunks.
         """
-        admin = user.role == 'admin'
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        writer = csv.writer(EchoBuffer())
+
+        yield writer.writerow(ExpenseService.get_csv_header(include_user))
+
+        # iterator() bypasses the queryset cache so only one chunk is held at a time
+        for row in expenses.iterator(chunk_size=chunk_size):
+            yield writer.writerow(row)
+
+    @staticmethod
+    async def astream_csv(expenses, include_user=False, chunk_size=None):
+        """
+        Async variant of stream_csv for ASGI, iterating the rows with the async ORM.
+        """
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        writer = csv.writer(EchoBuffer())
 
-        # 1. Total expenses per category
-        category_summary = ExpenseRepository.get_expenses_by_category(user=user, admin=admin)
+        yield writer.writerow(ExpenseService.get_csv_header(include_user))
 
-        # 2. Monthly totals for the current year
-        current_year = date.today().year
-        monthly_summary = ExpenseRepository.get_monthly_totals(current_year, user=user, admin=admin)
+        # values_list() querysets run their query eagerly when iteration starts, which the
+        # async ORM cannot do off the event loop; iterate dicts and rebuild the tuples instead
+        fields = expenses._fields
+        async for row in expenses.values(*fields).aiterator(chunk_size=chunk_size):
+            yield writer.writerow([row[field] for field in fields])
+
+    @staticmethod
+    def generate_analytics(user):
+        """
+        Generate analytics data, served from the analytics cache when possible.
+        """
+        admin = user.role == 'admin'
+        return AnalyticsCache.get_or_compute(
+            user, admin, lambda: ExpenseService.compute_analytics(user, admin)
+        )
 
-        # 3. Weekly trends for the last month
-        last_month = (date.today().replace(day=1) - timedelta(days=1)).month
-        weekly_trends = ExpenseRepository.get_weekly_trends(last_month, user=user, admin=admin)
+    @staticmethod
+    async def agenerate_analytics(user):
+        """
+        Async variant of generate_analytics, using the async cache and ORM.
+        """
+        admin = user.role == 'admin'
+        return await AnalyticsCache.aget_or_compute(
+            user, admin, lambda: ExpenseService.acompute_analytics(user, admin)
+        )
 
-        # 4. Highest spending category
-        highest_category = ExpenseRepository.get_highest_spending_category(user=user, admin=admin)
+    @staticmethod
+    def compute_analytics(user, admin):
+        """
+        Compute analytics data from the database.
+        """
+        # Category, monthly and weekly totals, the highest spending category and
+        # the highest single expense, computed in one pass over the data
+        return ExpenseService.format_analytics(ExpenseAnalyticsEngine.compute(user=user, admin=admin))
 
-        # 5. Highest single expense
-        highest_expense = ExpenseRepository.get_highest_single_expense(user=user, admin=admin)
+    @staticmethod
+    async def acompute_analytics(user, admin):
+        return ExpenseService.format_analytics(await ExpenseAnalyticsEngine.acompute(user=user, admin=admin))
 
-        # Format the response
+    @staticmethod
+    def format_analytics(analytics):
+        """
+        Shape the engine's summaries into the analytics response.
+        """
+        highest_expense = analytics['highest_single_expense']
         return {
-            "category_summary": {entry['category']: entry['total'] for entry in category_summary},
+            "category_summary": analytics['category_summary'],
             "monthly_summary": {
-                entry['month'].strftime('%B'): entry['total'] for entry in monthly_summary
+                month.strftime('%B'): total for month, total in analytics['monthly_summary'].items()
             },
             "weekly_trends": [
-                {"week": entry['week'].strftime('%Y-%m-%d'), "total": entry['total']}
-                for entry in weekly_trends
+                {"week": week.strftime('%Y-%m-%d'), "total": total}
+                for week, total in analytics['weekly_trends'].items()
             ],
-            "highest_spending_category": highest_category['category'] if highest_category else None,
+            "highest_spending_category": analytics['highest_spending_category'],
             "highest_single_expense": {
                 "title": highest_expense.title,
                 "amount": highest_expense.amount,
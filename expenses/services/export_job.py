@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from expenses.repositories.expense import ExpenseRepository
+from expenses.repositories.export_job import ExportJobRepository
+from expenses.services.expense import ExpenseService
+
+
+class ExportJobService:
+    """
+    Export jobs are queued in the database and written to disk by worker threads,
+    either in the web process or in `manage.py run_export_worker`.
+    """
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_scope(user):
+        return 'admin' if user.role == 'admin' else f'user:{user.id}'
+
+    @staticmethod
+    def request_export(start_date, end_date, user):
+        """
+        Queue an export and return (job, created).
+        An identical request made while a job is in progress gets that job back.
+        """
+        ExpenseService.validate_date_range(start_date, end_date)
+        scope = ExportJobService.get_scope(user)
+        key = f'{scope}|{start_date}|{end_date}'
+        job, created = ExportJobRepository.get_or_create_active_job(user, scope, key, start_date, end_date)
+        if created:
+            transaction.on_commit(ExportJobService.wake_workers)
+        return job, created
+
+    @staticmethod
+    def get_job(job_id, user):
+        return ExportJobRepository.get_job(job_id, ExportJobService.get_scope(user))
+
+    @staticmethod
+    def get_file_path(job):
+        return os.path.join(settings.EXPORT_JOB_DIR, f'export_{job.id}.csv')
+
+    @staticmethod
+    def run_job(job):
+        """
+        Write the job's CSV to disk, streaming rows from the database in chunks.
+        """
+        admin = job.scope == 'admin'
+        path = ExportJobService.get_file_path(job)
+        partial_path = f'{path}.part'
+        try:
+            os.makedirs(settings.EXPORT_JOB_DIR, exist_ok=True)
+            expenses = ExpenseRepository.get_export_rows(job.start_date, job.end_date, user=job.user_id, admin=admin)
+            lines = 0
+            with open(partial_path, 'w', newline='', encoding='utf-8') as export_file:
+                for line in ExpenseService.stream_csv(expenses, include_user=admin):
+                    export_file.write(line)
+                    lines += 1
+            # Downloads only ever see a complete file
+            os.replace(partial_path, path)
+        except Exception as e:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            ExportJobRepository.mark_failed(job, str(e))
+            return job
+        ExportJobRepository.mark_done(job, path, lines - 1)
+        return job
+
+    @staticmethod
+    def process_queue():
+        """
+        Run pending jobs until the queue is empty. Returns the number of jobs run.
+        """
+        processed = 0
+        try:
+            while True:
+                job = ExportJobRepository.claim_next_job()
+                if job is None:
+                    return processed
+                ExportJobService.run_job(job)
+                processed += 1
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def work(poll_interval=None, stop_when_empty=False):
+        """
+        Worker loop for run_export_worker: drain the queue, then poll it.
+        """
+        poll_interval = poll_interval or settings.EXPORT_JOB_POLL_INTERVAL
+        while True:
+            processed = ExportJobService.process_queue()
+            if stop_when_empty and not processed:
+                return
+            if not processed:
+                time.sleep(poll_interval)
+
+    @staticmethod
+    def wake_workers():
+        """
+        Have the in-process pool drain the queue, unless a separate worker process does that.
+        """
+        if not settings.EXPORT_JOB_IN_PROCESS:
+            return
+        with ExportJobService._lock:
+            if ExportJobService._executor is None:
+                ExportJobService._executor = ThreadPoolExecutor(
+                    max_workers=settings.EXPORT_JOB_WORKERS, thread_name_prefix='export-job'
+                )
+        ExportJobService._executor.submit(ExportJobService.process_queue)
@@ -0,0 +1,193 @@
+import json
+import zlib
+from itertools import islice
+
+from django.conf import settings
+
+from expenses.services.expense import ExpenseService
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ChunkBuffer:
+    """
+    File-like sink that collects writes until they are drained, so a writer
+    that expects a file can feed a streaming response.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CsvExporter:
+    name = 'csv'
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    @staticmethod
+    def stream(rows, include_user=False):
+        return ExpenseService.stream_csv(rows, include_user=include_user)
+
+
+class GzipCsvExporter:
+    name = 'csv.gz'
+    content_type = 'application/gzip'
+    extension = 'csv.gz'
+
+    @staticmethod
+    def stream(rows, include_user=False):
+        """
+        Gzip the CSV stream, emitting compressed data as soon as roughly
+        EXPORT_COMPRESS_CHUNK_SIZE bytes of CSV have been written.
+        """
+        # wbits=31 produces a gzip container rather than a raw zlib stream
+        compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+        pending = []
+        pending_size = 0
+        for line in ExpenseService.stream_csv(rows, include_user=include_user):
+            data = line.encode('utf-8')
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size >= settings.EXPORT_COMPRESS_CHUNK_SIZE:
+                compressed = compressor.compress(b''.join(pending))
+                pending, pending_size = [], 0
+                if compressed:
+                    yield compressed
+        yield compressor.compress(b''.join(pending)) + compressor.flush()
+
+
+class JsonLinesExporter:
+    name = 'jsonl'
+    content_type = 'application/x-ndjson'
+    extension = 'jsonl'
+
+    @staticmethod
+    def stream(rows, include_user=False):
+        """
+        Yield one JSON object per expense. Amounts stay strings to keep their exact value,
+        matching the API's decimal rendering.
+        """
+        keys = [column.lower() for column in ExpenseService.get_csv_header(include_user)]
+        encode = json.JSONEncoder(separators=(',', ':'), default=str).encode
+        for batch in batched(rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), settings.EXPORT_CHUNK_SIZE):
+            yield ''.join(encode(dict(zip(keys, row))) + '\n' for row in batch)
+
+
+class ArrowExporter:
+    name = 'arrow'
+    content_type = 'application/vnd.apache.arrow.stream'
+    extension = 'arrow'
+
+    @staticmethod
+    def get_schema(include_user=False):
+        fields = [
+            ('title', pyarrow.string()),
+            ('amount', pyarrow.decimal128(10, 2)),
+            ('category', pyarrow.string()),
+            ('date', pyarrow.date32()),
+        ]
+        if include_user:
+            fields.append(('user', pyarrow.string()))
+        return pyarrow.schema(fields)
+
+    @staticmethod
+    def record_batches(rows, schema):
+        """
+        Yield Arrow record batches of EXPORT_CHUNK_SIZE rows.
+        """
+        for batch in batched(rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), settings.EXPORT_CHUNK_SIZE):
+            columns = [pyarrow.array(column) for column in zip(*batch)]
+            # Amounts arrive as decimal strings; Arrow parses the whole column at once
+            yield pyarrow.record_batch(
+                [column.cast(field.type) for column, field in zip(columns, schema)], schema=schema
+            )
+
+    @staticmethod
+    def open_writer(sink, schema):
+        return pyarrow.ipc.new_stream(sink, schema)
+
+    @classmethod
+    def stream(cls, rows, include_user=False):
+        """
+        Yield the encoded bytes after each record batch, so memory holds a single batch at a time.
+        """
+        schema = cls.get_schema(include_user)
+        sink = ChunkBuffer()
+        writer = cls.open_writer(sink, schema)
+        for record_batch in cls.record_batches(rows, schema):
+            writer.write_batch(record_batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+
+class ParquetExporter(ArrowExporter):
+    name = 'parquet'
+    content_type = 'application/vnd.apache.parquet'
+    extension = 'parquet'
+
+    @staticmethod
+    def open_writer(sink, schema):
+        # Each record batch becomes one row group
+        return pyarrow.parquet.ParquetWriter(sink, schema, compression=settings.EXPORT_PARQUET_COMPRESSION)
+
+
+class ExporterRegistry:
+    """
+    Export formats by name. Formats whose optional dependency is missing are not registered.
+    """
+    exporters = {}
+
+    @staticmethod
+    def register(exporter):
+        ExporterRegistry.exporters[exporter.name] = exporter
+        return exporter
+
+    @staticmethod
+    def get_exporter(name):
+        exporter = ExporterRegistry.exporters.get(name or settings.EXPORT_DEFAULT_FORMAT)
+        if exporter is None:
+            raise ValueError(f"Unsupported format. Choose one of: {', '.join(ExporterRegistry.exporters)}.")
+        return exporter
+
+
+ExporterRegistry.register(CsvExporter)
+ExporterRegistry.register(GzipCsvExporter)
+ExporterRegistry.register(JsonLinesExporter)
+if pyarrow is not None:
+    ExporterRegistry.register(ArrowExporter)
+    ExporterRegistry.register(ParquetExporter)
@@ -0,0 +1,207 @@
+import csv
+import re
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+
+from expenses.serializers.expense import ExpenseImportSerializer
+from expenses.services.expense import ExpenseService
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+class ImportResult:
+    """
+    Running counters of an import. Only the first MAX_ERRORS errors are kept.
+    """
+    MAX_ERRORS = 100
+
+    def __init__(self, start_row=0):
+        self.last_row = start_row
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "last_row": self.last_row,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.errors,
+        }
+
+
+class ExpenseImportService:
+    FORMATS = ('csv', 'ofx')
+
+    @staticmethod
+    def parse_csv(lines):
+        """
+        Yield (row number, record) pairs from CSV lines with a header row.
+        Headers are matched case-insensitively, so exported files can be re-imported.
+        A row the csv module cannot read, such as one with a field over the size limit,
+        is yielded as its csv.Error; an unreadable header raises ValueError.
+        """
+        reader = csv.DictReader(lines)
+        try:
+            reader.fieldnames
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV header: {e}")
+
+        row_number = 0
+        while True:
+            row_number += 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # The reader starts afresh on the next line, so the import carries on
+                yield row_number, e
+                continue
+            yield row_number, {
+                (key or '').strip().lower(): (value or '').strip() for key, value in row.items()
+            }
+
+    @staticmethod
+    def parse_ofx(lines):
+        """
+        Yield (row number, record) pairs for the debit transactions of an OFX statement.
+        Both SGML (unclosed tags) and XML flavours are read one line at a time.
+        """
+        row_number = 0
+        transaction = None
+        for line in lines:
+            for closing, tag, value in OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if not closing:
+                        transaction = {}
+                        continue
+                    if transaction is not None:
+                        row_number += 1
+                        record = ExpenseImportService.map_ofx_transaction(transaction)
+                        if record is not None:
+                            yield row_number, record
+                    transaction = None
+                elif transaction is not None and not closing:
+                    transaction[tag] = value.strip()
+
+    @staticmethod
+    def map_ofx_transaction(transaction):
+        """
+        Convert an OFX transaction to an expense record, or None for credits.
+        """
+        try:
+            amount = Decimal(transaction.get('TRNAMT', ''))
+        except InvalidOperation:
+            amount = None
+        if amount is not None and amount >= 0:
+            return None
+        posted = transaction.get('DTPOSTED', '')[:8]
+        return {
+            'title': transaction.get('NAME') or transaction.get('MEMO', ''),
+            'amount': str(-amount) if amount is not None else transaction.get('TRNAMT', ''),
+            'category': '',
+            'date': f'{posted[:4]}-{posted[4:6]}-{posted[6:8]}' if len(posted) == 8 else posted,
+        }
+
+    @staticmethod
+    def validate(records):
+        """
+        Yield (row number, validated data, errors) triples.
+        """
+        for row_number, record in records:
+            if isinstance(record, csv.Error):
+                yield row_number, None, {"non_field_errors": [f"Malformed CSV row: {record}"]}
+                continue
+            serializer = ExpenseImportSerializer(data=record)
+            if serializer.is_valid():
+                yield row_number, serializer.validated_data, None
+            else:
+                yield row_number, None, serializer.errors
+
+    @staticmethod
+    def map_categories(records):
+        """
+        Rename known categories and derive missing ones from the title.
+        """
+        aliases = {key.lower(): value for key, value in settings.IMPORT_CATEGORY_ALIASES.items()}
+        keywords = [(key.lower(), value) for key, value in settings.IMPORT_CATEGORY_KEYWORDS.items()]
+        for row_number, data, errors in records:
+            if data is not None:
+                category = data.get('category', '')
+                if category:
+                    data['category'] = aliases.get(category.lower(), category)
+                else:
+                    title = data['title'].lower()
+                    data['category'] = next(
+                        (value for keyword, value in keywords if keyword in title),
+                        settings.IMPORT_DEFAULT_CATEGORY,
+                    )
+            yield row_number, data, errors
+
+    @staticmethod
+    def batched(records, batch_size):
+        """
+        Group records into lists of at most batch_size items.
+        """
+        records = iter(records)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def run(lines, user, file_format='csv', batch_size=None, start_row=0, on_batch=None):
+        """
+        Import expenses for the user from an iterable of text lines.
+        Rows up to start_row are skipped so an interrupted import can resume.
+        Each batch is committed on its own; on_batch(result) is called after every commit.
+        """
+        if file_format not in ExpenseImportService.FORMATS:
+            raise ValueError(f"Unsupported format. Choose one of: {', '.join(ExpenseImportService.FORMATS)}.")
+        batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        parse = getattr(ExpenseImportService, f'parse_{file_format}')
+
+        result = ImportResult(start_row)
+        records = (record for record in parse(lines) if record[0] > start_row)
+        pipeline = ExpenseImportService.map_categories(ExpenseImportService.validate(records))
+
+        for batch in ExpenseImportService.batched(pipeline, batch_size):
+            valid = []
+            for row_number, data, errors in batch:
+                if errors:
+                    result.add_error(row_number, errors)
+                else:
+                    valid.append(data)
+            if valid:
+                ExpenseService.bulk_create_expenses(valid, user)
+            result.rows += len(batch)
+            result.imported += len(valid)
+            result.last_row = batch[-1][0]
+            if on_batch:
+                on_batch(result)
+        return result
@@ -0,0 +1,101 @@
+import base64
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from expenses.models import ExpenseChangeLog
+from expenses.repositories.change_log import ExpenseChangeLogRepository
+from expenses.repositories.expense import ExpenseRepository
+
+
+class SyncTokenExpired(Exception):
+    """
+    The change log entries after the token may have been purged; the client must
+    download the full list again.
+    """
+
+
+class ExpenseSyncService:
+    """
+    Delta sync over the expense change log. A sync token holds the last change
+    sequence a client has applied and when it was issued.
+    """
+
+    @staticmethod
+    def encode_token(sequence, issued=None):
+        issued = int(time.time()) if issued is None else issued
+        return base64.urlsafe_b64encode(f'{sequence}|{issued}'.encode('ascii')).decode('ascii')
+
+    @staticmethod
+    def decode_token(token):
+        """
+        Return the (sequence, issued) pair of a token. Raises ValueError when it is
+        malformed and SyncTokenExpired when it outlived the change log retention.
+        """
+        try:
+            sequence, issued = base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii').split('|')
+            sequence, issued = int(sequence), int(issued)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValueError("Invalid sync token.")
+        if time.time() - issued > settings.EXPENSE_SYNC_RETENTION_DAYS * 86400:
+            raise SyncTokenExpired("The sync token has expired; download the full expense list again.")
+        return sequence, issued
+
+    @staticmethod
+    def get_changes(user, token, page_size, serializer):
+        """
+        Return the expenses created, updated or deleted after the token, oldest change first.
+        Without a token, return no changes and a token for the current position; fetch it
+        before a full download so nothing changed during the download is missed.
+        """
+        if not token:
+            sequence = ExpenseChangeLogRepository.get_last_sequence()
+            return {"changes": [], "next_token": ExpenseSyncService.encode_token(sequence), "has_more": False}
+
+        after, _ = ExpenseSyncService.decode_token(token)
+        # Tokens are reissued on every page, so a client paging through a long backlog
+        # can hold a fresh token whose position the purge has already passed
+        first = ExpenseChangeLogRepository.get_first_sequence()
+        if first is not None and after < first - 1:
+            raise SyncTokenExpired("The sync token has expired; download the full expense list again.")
+        admin = user.role == 'admin'
+        entries = ExpenseChangeLogRepository.get_user_changes(after, page_size + 1, user=user, admin=admin)
+        has_more = len(entries) > page_size
+        entries = entries[:page_size]
+
+        # Only the last change of each expense matters; later states supersede earlier ones
+        latest = {}
+        for entry in entries:
+            latest.pop(entry['expense_id'], None)
+            latest[entry['expense_id']] = entry
+        upserted_ids = [
+            expense_id for expense_id, entry in latest.items() if entry['op'] != ExpenseChangeLog.DELETE
+        ]
+        rows = {}
+        if upserted_ids:
+            expenses = ExpenseRepository.get_expenses_by_ids(upserted_ids, user=user, admin=admin)
+            rows = {row['id']: row for row in expenses.values(*serializer.source_fields)}
+
+        changes = []
+        for expense_id, entry in latest.items():
+            if entry['op'] == ExpenseChangeLog.DELETE:
+                changes.append({"seq": entry['id'], "op": "delete", "id": expense_id})
+            elif expense_id in rows:
+                changes.append({
+                    "seq": entry['id'], "op": "upsert", "id": expense_id,
+                    "expense": serializer.to_representation(rows[expense_id]),
+                })
+            # Otherwise the expense was deleted by a change on a later page
+
+        sequence = entries[-1]['id'] if entries else after
+        return {"changes": changes, "next_token": ExpenseSyncService.encode_token(sequence), "has_more": has_more}
+
+    @staticmethod
+    def purge_change_log():
+        """
+        Delete change log entries older than the sync token lifetime.
+        """
+        cutoff = timezone.now() - timedelta(days=settings.EXPENSE_SYNC_RETENTION_DAYS)
+        return ExpenseChangeLogRepository.purge_before(cutoff)
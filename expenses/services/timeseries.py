@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek
+
+from expenses.repositories.rollup import ExpenseRollupRepository
+
+
+def period_start(day, granularity):
+    """
+    Return the first day of the period containing `day`. Weeks start on Monday.
+    """
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return day
+
+
+def next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity in ('month', 'quarter'):
+        month = start.month - 1 + (3 if granularity == 'quarter' else 1)
+        return date(start.year + month // 12, month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+class TimeSeriesService:
+    TRUNCS = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+        'quarter': TruncQuarter,
+    }
+
+    @staticmethod
+    def parse_params(params, today=None):
+        """
+        Validate ?start=, ?end= (inclusive, YYYY-MM-DD) and ?granularity=.
+        The range defaults to the last year and the granularity to month.
+        """
+        granularity = params.get('granularity') or 'month'
+        if granularity not in TimeSeriesService.TRUNCS:
+            raise ValueError(f"granularity must be one of: {', '.join(TimeSeriesService.TRUNCS)}.")
+        try:
+            end = date.fromisoformat(params['end']) if params.get('end') else (today or date.today())
+            start = date.fromisoformat(params['start']) if params.get('start') else end - timedelta(days=364)
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format.")
+        if start > end:
+            raise ValueError("start must not be after end.")
+        return start, end, granularity
+
+    @staticmethod
+    def get_periods(start, end, granularity):
+        """
+        Return the start of every period overlapping start..end (inclusive).
+        """
+        periods = []
+        period = period_start(start, granularity)
+        while period <= end:
+            periods.append(period)
+            if len(periods) > settings.TIMESERIES_MAX_POINTS:
+                raise ValueError(
+                    f"The range has more than {settings.TIMESERIES_MAX_POINTS} {granularity} periods; "
+                    "narrow it or use a coarser granularity."
+                )
+            period = next_period(period, granularity)
+        return periods
+
+    @staticmethod
+    def get_time_series(user, start, end, granularity, by_category=False):
+        """
+        Total spending per period from the daily rollups, with periods that have no
+        expenses filled in as zero. Periods at the edges only count days inside the range.
+        """
+        admin = user.role == 'admin'
+        periods = TimeSeriesService.get_periods(start, end, granularity)
+        rows = ExpenseRollupRepository.get_period_totals(
+            start, end + timedelta(days=1), TimeSeriesService.TRUNCS[granularity],
+            user=user, admin=admin, by_category=by_category,
+        )
+
+        points = {period: {"total": 0, "count": 0} for period in periods}
+        categories = set()
+        for row in rows:
+            point = points[row['period']]
+            point["total"] += row['total']
+            point["count"] += row['count']
+            if by_category:
+                categories.add(row['category'])
+                point.setdefault("categories", {})[row['category']] = row['total']
+
+        series = []
+        for period, point in points.items():
+            entry = {"period": period.isoformat(), "total": point["total"], "count": point["count"]}
+            if by_category:
+                entry["categories"] = {
+                    category: point.get("categories", {}).get(category, 0) for category in sorted(categories)
+                }
+            series.append(entry)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "granularity": granularity,
+            "series": series,
+        }
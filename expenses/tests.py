@@ -1,3 +1,933 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import caches
+from django.utils.http import http_date, parse_http_date
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expense_tracker.db import get_read_alias
+from expense_tracker.metrics import MetricsStore
+from expense_tracker.middleware import CompressionMiddleware
+from expense_tracker.renderers import FastJSONParser, FastJSONRenderer
+from expenses.serializers.expense import ExpenseReadSerializer, ExpenseSerializer
+from expenses.checks import check_version_cache
+from expenses.models import (
+    AdminTopExpense, ArchivedExpense, Expense, ExpenseChangeLog, ExpenseDailyRollup, ExpenseMonthlySummary,
+    ExportJob,
+)
+from expenses.repositories.change_log import ExpenseChangeLogRepository
+from expenses.repositories.expense import ExpenseRepository
+from expenses.repositories.export_job import ExportJobRepository
+from expenses.repositories.rollup import ExpenseRollupRepository
+from expenses.services.cache import AnalyticsCache, ExpenseVersionCache
+from expenses.services.dashboard import AdminDashboardService
+from expenses.services.expense import ExpenseService
+from expenses.services.analytics import ExpenseAnalyticsEngine, numpy
+from expenses.services.export_job import ExportJobService
+from expenses.services.importer import ExpenseImportService
+from expenses.services.sync import ExpenseSyncService
+from users.models import CustomUser
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Harness for pinning the number of queries each endpoint issues.
+    Query counts must not grow with the number of rows or owners involved.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='regular', password='secret')
+        cls.admin = CustomUser.objects.create_user(username='admin', password='secret', role='admin')
+        owners = [cls.user] + [
+            CustomUser.objects.create_user(username=f'owner{i}', password='secret') for i in range(5)
+        ]
+        Expense.objects.bulk_create([
+            Expense(
+                title=f'Expense {i}',
+                amount=10 + i,
+                category=['Food', 'Travel', 'Rent'][i % 3],
+                date=date(2025, 1 + i % 12, 1 + i % 28),
+                user=owners[i % len(owners)],
+            )
+            for i in range(60)
+        ])
+        cls.expense = Expense.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def assertEndpointQueries(self, num, user, method, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(num):
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
+
+
+class ExpenseEndpointQueryTests(QueryCountTestCase):
+    def test_list(self):
+        url = reverse('expense-list-create')
+        # COUNT for the paginator, then one SELECT for the page
+        self.assertEndpointQueries(2, self.user, 'get', url)
+        self.assertEndpointQueries(2, self.admin, 'get', url)
+        # Skipping the count, and keyset pages, take a single SELECT
+        self.assertEndpointQueries(1, self.admin, 'get', url, {'count': 'false', 'page': 3})
+        self.assertEndpointQueries(1, self.admin, 'get', url, {'pagination': 'cursor'})
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('expense-list-create') + '?pagination=cursor&page_size=7'
+        seen = []
+        while url:
+            response = client.get(url)
+            seen.extend((row['date'], row['id']) for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), Expense.objects.count())
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=5)
+    def test_page_size_is_capped(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('expense-list-create')
+        for pagination in ('page', 'cursor'):
+            response = client.get(url, {'pagination': pagination, 'page_size': 50})
+            self.assertEqual(len(response.data['results']), 5)
+
+    def test_detail(self):
+        url = reverse('expense-detail', args=[self.expense.id])
+        self.assertEndpointQueries(1, self.user, 'get', url)
+        self.assertEndpointQueries(1, self.admin, 'get', url)
+
+    def test_export(self):
+        url = reverse('expense-export')
+        params = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        for stream in ('true', 'false'):
+            response = self.assertEndpointQueries(1, self.user, 'get', url, {**params, 'stream': stream})
+            self.assertEqual(response.status_code, 200)
+            # Admin exports join the owner's username instead of loading each user
+            response = self.assertEndpointQueries(1, self.admin, 'get', url, {**params, 'stream': stream})
+            self.assertEqual(response.status_code, 200)
+
+    def test_export_formats(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('expense-export')
+        params = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+
+        def export(export_format):
+            with self.assertNumQueries(1):
+                response = client.get(url, {**params, 'format': export_format})
+                return b''.join(response.streaming_content)
+
+        self.assertEqual(gzip.decompress(export('csv.gz')), export('csv'))
+        lines = export('jsonl').splitlines()
+        self.assertEqual(len(lines), 60)
+        self.assertEqual(set(json.loads(lines[0])), {'title', 'amount', 'category', 'date', 'user'})
+        self.assertEqual(client.get(url, {**params, 'format': 'xml'}).status_code, 400)
+
+    def test_analytics(self):
+        url = reverse('expense-analytics')
+        # One grouped scan plus one lookup for the highest single expense
+        self.assertEndpointQueries(2, self.user, 'get', url)
+        self.assertEndpointQueries(2, self.admin, 'get', url)
+
+
+class AsyncEndpointTests(QueryCountTestCase):
+    def test_async_endpoints_match_sync(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        params = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        sync_list = client.get(reverse('expense-list-create'), {'pagination': 'cursor'})
+        sync_export = client.get(reverse('expense-export'), params)
+
+        async def fetch():
+            async_client = AsyncClient(AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+            listing = await async_client.get(reverse('async-expense-list-create'))
+            export = await async_client.get(reverse('async-expense-export'), params)
+            missing = await async_client.get(reverse('async-expense-detail', args=[self.expense.id + 10**6]))
+            return listing.json(), b''.join([chunk async for chunk in export.streaming_content]), missing
+
+        async_list, async_export, missing = async_to_sync(fetch)()
+        self.assertEqual(async_list['results'], sync_list.json()['results'])
+        self.assertEqual(async_export, b''.join(sync_export.streaming_content))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_async_analytics_match_sync(self):
+        ExpenseRollupRepository.rebuild([self.user.id])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        sync_analytics = client.get(reverse('expense-analytics')).json()
+        caches['default'].clear()
+
+        async def fetch():
+            async_client = AsyncClient(AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+            computed = await async_client.get(reverse('async-expense-analytics'))
+            cached = await async_client.get(reverse('async-expense-analytics'))
+            return computed.json(), cached.json()
+
+        AnalyticsCache.reset_stats()
+        computed, cached = async_to_sync(fetch)()
+        self.assertEqual(computed, sync_analytics)
+        self.assertEqual(cached, sync_analytics)
+        self.assertEqual(AnalyticsCache.get_stats(), {'hits': 1, 'misses': 1})
+
+
+class ExportJobTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        settings_override = override_settings(EXPORT_JOB_DIR=export_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_identical_requests_share_a_job(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        params = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        first = client.post(reverse('export-job-list'), params, format='json')
+        second = client.post(reverse('export-job-list'), params, format='json')
+        self.assertEqual((first.status_code, second.status_code), (202, 200))
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(client.get(first.data['status_url']).data['download_url'], None)
+
+        job = ExportJobRepository.claim_next_job()
+        ExportJobService.run_job(job)
+        status = client.get(first.data['status_url']).data
+        self.assertEqual((status['status'], status['rows']), ('done', 60))
+
+        download = client.get(status['download_url'])
+        export = client.get(reverse('expense-export'), params)
+        self.assertEqual(b''.join(download.streaming_content), b''.join(export.streaming_content))
+
+        # Finished jobs are not reused, and other users cannot see admin jobs
+        third = client.post(reverse('export-job-list'), params, format='json')
+        self.assertNotEqual(third.data['id'], first.data['id'])
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(first.data['status_url']).status_code, 404)
+
+    @override_settings(EXPORT_JOB_TIMEOUT=60)
+    def test_jobs_of_a_stopped_worker_are_requeued(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        params = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        job_id = client.post(reverse('export-job-list'), params, format='json').data['id']
+        self.assertEqual(ExportJobRepository.claim_next_job().id, job_id)
+        # A job still within the timeout is left to its worker
+        self.assertIsNone(ExportJobRepository.claim_next_job())
+
+        ExportJob.objects.filter(id=job_id).update(started_at=F('started_at') - timedelta(seconds=61))
+        job = ExportJobRepository.claim_next_job()
+        self.assertEqual(job.id, job_id)
+        ExportJobService.run_job(job)
+        self.assertEqual(ExportJob.objects.get(id=job_id).status, ExportJob.DONE)
+
+
+class RequestMetricsTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        MetricsStore.reset()
+
+    def test_server_timing_and_metrics_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('expense-list-create'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertEqual(client.get(reverse('metrics')).status_code, 403)
+
+        client.force_authenticate(self.admin)
+        metrics = client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_requests_total{view="expense-list-create",method="GET",status="200"} 1', metrics)
+        self.assertIn('http_request_db_queries_total{view="expense-list-create",method="GET",status="200"} 2', metrics)
+
+    def test_async_views_are_not_adapted(self):
+        # Every middleware runs async, so the chain is never wrapped in async_to_sync
+        # Django only logs the adaptation when DEBUG is on
+        client = AsyncClient(AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            response = async_to_sync(client.get)(reverse('async-expense-list-create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        totals, _ = MetricsStore.snapshot()
+        self.assertEqual(totals[('async-expense-list-create', 'GET', '200')]['requests'], 1)
+
+
+@override_settings(ADMIN_DASHBOARD_REFRESH_OVERLAP=0, ADMIN_DASHBOARD_TOP_N=3)
+class AdminDashboardTests(QueryCountTestCase):
+    def assertSummariesMatch(self):
+        expected = (
+            Expense.objects.annotate(month=TruncMonth('date'))
+            .values_list('user_id', 'month', 'category').annotate(Sum('amount'), Count('id'))
+        )
+        summaries = ExpenseMonthlySummary.objects.values_list('user_id', 'month', 'category', 'total', 'count')
+        self.assertEqual(set(summaries), set(expected))
+        top = list(Expense.objects.order_by('-amount', '-id').values_list('id', flat=True)[:3])
+        self.assertEqual(list(AdminTopExpense.objects.order_by('rank').values_list('expense_id', flat=True)), top)
+
+    def test_incremental_refresh_follows_writes(self):
+        AdminDashboardService.refresh()
+        self.assertSummariesMatch()
+
+        expense = Expense.objects.filter(user=self.user, date__month=1).first()
+        ExpenseService.update_expense(expense.id, self.user, {'amount': '500.00', 'date': '2024-12-31'})
+        ExpenseService.delete_expense(Expense.objects.filter(user=self.user).exclude(id=expense.id).first().id, self.user)
+        ExpenseService.create_expense(
+            {'title': 'Flight', 'amount': Decimal('400'), 'category': 'Travel', 'date': date(2025, 6, 3)}, self.admin
+        )
+        AdminDashboardService.refresh()
+        self.assertSummariesMatch()
+
+    def test_refresh_overlap_keeps_ranked_rows_once(self):
+        # The fixture is bulk created without change log entries, inside the default overlap
+        with override_settings(ADMIN_DASHBOARD_REFRESH_OVERLAP=60):
+            AdminDashboardService.refresh()
+            AdminDashboardService.refresh()
+        self.assertSummariesMatch()
+
+    def test_dashboard_is_admin_only(self):
+        self.assertEndpointQueries(0, self.user, 'get', reverse('admin-dashboard'))
+        AdminDashboardService.refresh()
+        # The state row, then one query per section; no expense is scanned
+        response = self.assertEndpointQueries(5, self.admin, 'get', reverse('admin-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row['count'] for row in response.data['category_totals']), 60)
+
+
+@override_settings(EXPENSE_ARCHIVE_AFTER_DAYS=(date.today() - date(2025, 7, 1)).days)
+class ExpenseArchiveTests(QueryCountTestCase):
+    def export(self, start_date, user):
+        response = self.assertEndpointQueries(1, user, 'get', reverse('expense-export'), {
+            'start_date': start_date, 'end_date': '2025-12-31',
+        })
+        return sorted(b''.join(response.streaming_content).decode().splitlines())
+
+    def test_reads_span_both_tables(self):
+        before = self.export('2025-01-01', self.admin)
+        highest = ExpenseRepository.get_highest_single_expense(admin=True)
+        ExpenseRollupRepository.rebuild([self.user.id])
+        call_command('archive_expenses', stdout=io.StringIO())
+
+        self.assertEqual(ArchivedExpense.objects.count(), 30)
+        self.assertFalse(Expense.objects.filter(date__lt=date(2025, 7, 1)).exists())
+        self.assertEqual(self.export('2025-01-01', self.admin), before)
+        self.assertEqual(ExpenseRepository.get_highest_single_expense(admin=True).id, highest.id)
+        self.assertEqual(ExpenseRollupRepository.find_mismatches([self.user.id]), {})
+
+        # Ranges after the cutoff never touch the archive
+        with self.assertNumQueries(1) as queries:
+            list(ExpenseRepository.get_expenses_by_date_range('2025-07-01', '2025-12-31', user=self.user))
+        self.assertNotIn('archivedexpense', queries.captured_queries[0]['sql'])
+
+    @override_settings(ADMIN_DASHBOARD_REFRESH_OVERLAP=0, ADMIN_DASHBOARD_TOP_N=3)
+    def test_dashboard_ranks_archived_expenses(self):
+        Expense.objects.filter(id=Expense.objects.filter(date__lt=date(2025, 7, 1)).first().id).update(
+            amount=Decimal('9999.00')
+        )
+        AdminDashboardService.refresh()
+        call_command('archive_expenses', stdout=io.StringIO())
+        ExpenseService.create_expense(
+            {'title': 'Flight', 'amount': Decimal('400'), 'category': 'Travel', 'date': date(2025, 8, 3)}, self.admin
+        )
+
+        for full in (False, True):
+            AdminDashboardService.refresh(full=full)
+            top_expenses = AdminDashboardService.get_dashboard()['top_expenses']
+            highest = ExpenseRepository.get_highest_single_expense(admin=True)
+            self.assertEqual(top_expenses[0]['id'], highest.id)
+            self.assertEqual(top_expenses[0]['amount'], Decimal('9999.00'))
+            self.assertTrue(ArchivedExpense.objects.filter(id=highest.id).exists())
+
+
+class TimeSeriesTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        ExpenseRollupRepository.rebuild([self.user.id])
+
+    def get_series(self, **params):
+        response = self.assertEndpointQueries(1, self.user, 'get', reverse('expense-timeseries'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['series']
+
+    def test_granularities_are_zero_filled(self):
+        expected = Expense.objects.filter(user=self.user, date__gte=date(2025, 1, 1), date__lte=date(2025, 12, 31))
+        quarters = self.get_series(start='2025-01-01', end='2025-12-31', granularity='quarter')
+        self.assertEqual([point['period'] for point in quarters], ['2025-01-01', '2025-04-01', '2025-07-01', '2025-10-01'])
+        self.assertEqual(sum(point['total'] for point in quarters), expected.aggregate(Sum('amount'))['amount__sum'])
+
+        weeks = self.get_series(start='2024-12-30', end='2025-03-02', granularity='week', by_category='true')
+        self.assertEqual(len(weeks), 9)
+        # The user has no February expenses
+        self.assertEqual(weeks[-1], {'period': '2025-02-24', 'total': 0, 'count': 0, 'categories': {'Food': 0}})
+        self.assertEqual(weeks[0]['categories']['Food'], weeks[0]['total'])
+
+    def test_invalid_params(self):
+        for params in ({'granularity': 'year'}, {'start': '2025-02-01', 'end': '2025-01-01'}, {'start': 'May'}):
+            response = self.assertEndpointQueries(0, self.user, 'get', reverse('expense-timeseries'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_weekly_trends_ignore_other_years(self):
+        rows = [('Food', date(2025, 3, 3), 10), ('Food', date(2024, 3, 4), 99)]
+        weeks = ExpenseAnalyticsEngine.fold(rows, today=date(2025, 4, 15))['weekly_trends']
+        self.assertEqual(weeks, {date(2025, 3, 3): 10})
+
+
+class ConditionalGetTests(QueryCountTestCase):
+    def test_unchanged_expenses_get_304_without_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        urls = [
+            reverse('expense-list-create'), reverse('expense-detail', args=[self.expense.id]),
+            reverse('expense-analytics'),
+        ]
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        for url, etag in etags.items():
+            with self.assertNumQueries(0):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual((response.status_code, response['ETag']), (304, etag))
+
+        # Another user's write leaves this user's versions alone; the user's own write does not
+        ExpenseService.create_expense(
+            {'title': 'Taxi', 'amount': Decimal('30'), 'category': 'Travel', 'date': date(2025, 5, 1)}, self.admin
+        )
+        self.assertEqual(client.get(urls[0], HTTP_IF_NONE_MATCH=etags[urls[0]]).status_code, 304)
+        ExpenseService.update_expense(self.expense.id, self.user, {'title': 'Renamed'})
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_rounds_up(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('expense-list-create')
+        response = client.get(url)
+        _, modified = ExpenseVersionCache.get(self.user.id)
+        last_modified = parse_http_date(response['Last-Modified'])
+        self.assertGreaterEqual(last_modified, modified)
+        self.assertEqual(client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(last_modified - 1)).status_code, 200)
+
+    def test_analytics_etag_changes_with_the_date(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('expense-analytics')
+        response = client.get(url)
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        with mock.patch('expenses.conditional.date', Tomorrow):
+            for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']},
+                            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}):
+                self.assertEqual(client.get(url, **headers).status_code, 200)
+
+    def test_deploy_check_warns_about_per_process_version_cache(self):
+        self.assertEqual([warning.id for warning in check_version_cache(None)], ['expenses.W001'])
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+        with override_settings(CACHES={'default': shared}):
+            self.assertEqual(check_version_cache(None), [])
+
+
+class ExpenseReadSerializerTests(QueryCountTestCase):
+    def serialize(self, user):
+        request = SimpleNamespace(user=user)
+        serializer = ExpenseReadSerializer(request)
+        expenses = Expense.objects.order_by('id')
+        expected = [dict(row) for row in ExpenseSerializer(expenses, many=True, context={'request': request}).data]
+        return serializer.serialize_many(expenses.values(*serializer.source_fields)), expected
+
+    def test_matches_model_serializer(self):
+        Expense.objects.filter(id=self.expense.id).update(
+            amount=Decimal('1234.5'), created_at=datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+        )
+        for time_zone in ('UTC', 'Europe/Berlin'):
+            for user in (self.user, self.admin):
+                with self.subTest(time_zone=time_zone, role=user.role), override_settings(TIME_ZONE=time_zone):
+                    rows, expected = self.serialize(user)
+                    self.assertEqual(rows, expected)
+                    self.assertEqual('user' in rows[0], user.role == 'admin')
+
+        rows, _ = self.serialize(self.user)
+        row = next(row for row in rows if row['id'] == self.expense.id)
+        self.assertEqual((row['amount'], row['created_at']), ('1234.50', '2025-03-01T09:30:15.123456Z'))
+
+
+class ResponseEncodingTests(QueryCountTestCase):
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'amount': Decimal('12.50'), 'date': date(2025, 3, 1), 'title': 'Caf\u00e9 \u2028',
+            'created_at': datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc), 7: [None, 1.5],
+        }
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(rendered)), json.loads(rendered))
+
+    @override_settings(COMPRESSION_MIN_SIZE=200)
+    def test_large_responses_are_compressed(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('expense-list-create')
+        plain = client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+        # Bodies under the threshold are sent as they are
+        small = client.get(reverse('expense-detail', args=[self.expense.id]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_MIN_SIZE=200)
+    def test_compression_middleware_runs_async(self):
+        async def get_response(request):
+            return HttpResponse(b'{"title": "Taxi"}' * 50, content_type='application/json')
+
+        middleware = CompressionMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'{"title": "Taxi"}' * 50)
+
+
+class ExpenseSyncTests(QueryCountTestCase):
+    def sync(self, since=None, queries=3, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.assertEndpointQueries(queries, self.user, 'get', reverse('expense-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_token(self):
+        token = self.sync(queries=1)['next_token']
+        self.assertEqual(self.sync(token, queries=2)['changes'], [])
+
+        data = {'title': 'Taxi', 'amount': Decimal('30'), 'category': 'Travel', 'date': date(2025, 5, 1)}
+        created = ExpenseService.create_expense(data, self.user)
+        ExpenseService.create_expense(data, self.admin)
+        ExpenseService.update_expense(self.expense.id, self.user, {'title': 'Renamed'})
+        ExpenseService.update_expense(created.id, self.user, {'amount': '35.00'})
+        ExpenseService.delete_expense(self.expense.id, self.user)
+
+        # The first page's update of the since-deleted expense is skipped; its tombstone follows
+        first = self.sync(token, page_size=2)
+        self.assertTrue(first['has_more'])
+        self.assertEqual([change['op'] for change in first['changes']], ['upsert'])
+        second = self.sync(first['next_token'], page_size=2)
+        self.assertFalse(second['has_more'])
+        self.assertEqual(
+            [(change['op'], change['id']) for change in second['changes']],
+            [('upsert', created.id), ('delete', self.expense.id)],
+        )
+        self.assertEqual(second['changes'][0]['expense']['amount'], '35.00')
+        self.assertEqual(self.sync(second['next_token'], queries=2)['changes'], [])
+
+    def test_invalid_and_expired_tokens(self):
+        for token, status_code in (('bogus', 400), (ExpenseSyncService.encode_token(0, issued=0), 410)):
+            response = self.assertEndpointQueries(0, self.user, 'get', reverse('expense-changes'), {'since': token})
+            self.assertEqual(response.status_code, status_code)
+
+    def test_purge_expires_tokens_behind_it(self):
+        token = self.sync(queries=1)['next_token']
+        data = {'title': 'Taxi', 'amount': Decimal('30'), 'category': 'Travel', 'date': date(2025, 5, 1)}
+        for _ in range(3):
+            ExpenseService.create_expense(data, self.user)
+        first = self.sync(token, page_size=1)
+
+        # The token was issued just now, but the entries after its position are gone
+        self.assertEqual(ExpenseChangeLogRepository.purge_before(datetime.now(timezone.utc)), 2)
+        response = self.assertEndpointQueries(1, self.user, 'get', reverse('expense-changes'), {
+            'since': first['next_token'], 'page_size': 1,
+        })
+        self.assertEqual(response.status_code, 410)
+
+        # The newest entry is kept, so a client that was caught up still syncs
+        caught_up = self.sync(ExpenseSyncService.encode_token(ExpenseChangeLog.objects.get().id), queries=2)
+        self.assertEqual(caught_up['changes'], [])
+
+
+class MoneyFieldTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        # The fixture is bulk created, which skips the rollups
+        ExpenseRollupRepository.rebuild(list(CustomUser.objects.values_list('id', flat=True)))
+
+    def test_amounts_are_stored_as_minor_units(self):
+        expense = ExpenseService.create_expense(
+            {'title': 'Taxi', 'amount': Decimal('30.05'), 'category': 'Travel', 'date': date(2025, 5, 1)}, self.user
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM expenses_expense WHERE id = %s', [expense.id])
+            self.assertEqual(cursor.fetchone()[0], 3005)
+        self.assertEqual(Expense.objects.get(id=expense.id).amount, Decimal('30.05'))
+        self.assertTrue(Expense.objects.filter(id=expense.id, amount__gte=Decimal('30.05')).exists())
+        totals = Expense.objects.filter(user=self.user, category='Travel').aggregate(total=Sum('amount'))
+        self.assertEqual(totals['total'], sum(
+            Expense.objects.filter(user=self.user, category='Travel').values_list('amount', flat=True)
+        ))
+        self.assertEqual(ExpenseRollupRepository.find_mismatches([self.user.id]), {})
+
+        rows = ExpenseRepository.get_export_rows('2025-05-01', '2025-05-01', user=self.user)
+        self.assertEqual(list(rows), [('Taxi', '30.05', 'Travel', date(2025, 5, 1))])
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_array_fold_matches_fold(self):
+        rows = list(ExpenseRollupRepository.get_daily_category_totals(admin=True))
+        rows += [
+            ('Food', date(2025, 3, 31), -150),
+            # March 2025 starts on a Saturday, so its first week is keyed in February
+            ('Food', date(2025, 3, 1), 25),
+            # The last week of 2025 runs into 2026, and 2024 rows fall outside both years
+            ('Travel', date(2025, 12, 30), 700),
+            ('Rent', date(2026, 1, 2), 900),
+            ('Food', date(2024, 12, 31), 50),
+        ]
+        for today in (date(2025, 4, 15), date(2026, 1, 3)):
+            self.assertEqual(
+                ExpenseAnalyticsEngine.fold_arrays(rows, today=today), ExpenseAnalyticsEngine.fold(rows, today=today)
+            )
+
+        summaries = ExpenseAnalyticsEngine.fold_arrays(rows, today=date(2026, 1, 3))
+        self.assertEqual(summaries['monthly_summary'], {date(2026, 1, 1): 900})
+        self.assertEqual(summaries['weekly_trends'][date(2025, 12, 29)], 700)
+        summaries = ExpenseAnalyticsEngine.fold_arrays(rows, today=date(2025, 4, 15))
+        self.assertEqual(next(iter(summaries['weekly_trends'])), date(2025, 2, 24))
+        self.assertEqual(ExpenseAnalyticsEngine.fold_arrays([])['category_summary'], {})
+
+
+class DatabaseProfileTests(TestCase):
+    def test_pragmas_and_read_alias(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        self.assertEqual(get_read_alias(), 'default')
+        # An alias missing from DATABASES falls back to the default database
+        with override_settings(DATABASE_READ_REPLICA='replica'):
+            self.assertEqual(get_read_alias(), 'default')
+
+
+class ExpenseRollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+
+    def assertRollupsMatch(self):
+        self.assertEqual(ExpenseRollupRepository.find_mismatches([self.user.id]), {})
+
+    def test_rollups_follow_writes(self):
+        expense = ExpenseService.create_expense(
+            {'title': 'Lunch', 'amount': Decimal('12.50'), 'category': 'Food', 'date': date(2025, 3, 1)}, self.user
+        )
+        ExpenseService.create_expense(
+            {'title': 'Dinner', 'amount': Decimal('20.00'), 'category': 'Food', 'date': date(2025, 3, 1)}, self.user
+        )
+        rollup = ExpenseDailyRollup.objects.get(user=self.user, category='Food', date=date(2025, 3, 1))
+        self.assertEqual((rollup.total, rollup.count), (Decimal('32.50'), 2))
+
+        # Raw request data moves the amount to the new category and day
+        ExpenseService.update_expense(
+            expense.id, self.user, {'amount': '15.00', 'category': 'Travel', 'date': '2025-03-02'}
+        )
+        self.assertRollupsMatch()
+
+        ExpenseService.delete_expense(expense.id, self.user)
+        self.assertRollupsMatch()
+        self.assertFalse(ExpenseDailyRollup.objects.filter(category='Travel').exists())
+
+    def test_rebuild(self):
+        Expense.objects.create(title='Rent', amount=Decimal('900'), category='Rent', date=date(2025, 3, 1), user=self.user)
+        self.assertNotEqual(ExpenseRollupRepository.find_mismatches([self.user.id]), {})
+        ExpenseRollupRepository.rebuild([self.user.id])
+        self.assertRollupsMatch()
+
+
+class ExpenseFilterTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title, category in (
+            ('Weekly groceries', 'Food'), ('Seafood dinner', 'Sea  Food'), ('Taxi to the airport', 'Travel'),
+            ('Fast food', 'Fast food'),
+        ):
+            ExpenseService.create_expense(
+                {'title': title, 'amount': Decimal('10'), 'category': category, 'date': date(2025, 3, 1)}, self.user
+            )
+
+    def titles(self, **params):
+        response = self.client.get(reverse('expense-list-create'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(expense['title'] for expense in response.data['results'])
+
+    def test_category_match_modes(self):
+        # Substring matching stays the default, case- and whitespace-insensitively
+        everything_food = ['Fast food', 'Seafood dinner', 'Weekly groceries']
+        self.assertEqual(self.titles(category='foo'), everything_food)
+        self.assertEqual(self.titles(category='FOOD', category_match='contains'), everything_food)
+        self.assertEqual(self.titles(category='foo', category_match='bogus'), everything_food)
+        self.assertEqual(self.titles(category=' food ', category_match='exact'), ['Weekly groceries'])
+        self.assertEqual(self.titles(category='sea food', category_match='exact'), ['Seafood dinner'])
+        self.assertEqual(self.titles(category='foo', category_match='exact'), [])
+        self.assertEqual(self.titles(category='Fa', category_match='prefix'), ['Fast food'])
+
+    def test_title_search_follows_updates_and_deletes(self):
+        self.assertEqual(self.titles(search='airp'), ['Taxi to the airport'])
+        self.assertEqual(self.titles(search='seafood DINNER'), ['Seafood dinner'])
+        self.assertEqual(self.titles(search='"*'), [])
+
+        taxi = Expense.objects.get(title='Taxi to the airport')
+        ExpenseService.update_expense(taxi.id, self.user, {'title': 'Train to the station'})
+        self.assertEqual(self.titles(search='airport'), [])
+        self.assertEqual(self.titles(search='station'), ['Train to the station'])
+
+        ExpenseService.delete_expense(taxi.id, self.user)
+        self.assertEqual(self.titles(search='station'), [])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM expenses_expense_fts WHERE expenses_expense_fts MATCH 'station'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class BulkExpenseTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+        self.other = CustomUser.objects.create_user(username='other', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('expense-bulk')
+
+    def item(self, **data):
+        return {'title': 'Lunch', 'amount': '12.50', 'category': 'Food', 'date': '2025-03-01', **data}
+
+    def assertRollupsMatch(self):
+        self.assertEqual(ExpenseRollupRepository.find_mismatches([self.user.id, self.other.id]), {})
+
+    def test_create_is_all_or_nothing(self):
+        response = self.client.post(self.url, [self.item(), self.item(amount='oops')], format='json')
+        self.assertEqual(response.status_code, 400)
+        # Errors are keyed by the position of each invalid item
+        self.assertEqual(list(response.data['errors']), [1])
+        self.assertIn('amount', response.data['errors'][1])
+        self.assertFalse(Expense.objects.exists())
+
+        response = self.client.post(self.url, [self.item(), self.item(category='Travel')], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertRollupsMatch()
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_item_cap(self):
+        response = self.client.post(self.url, [self.item()] * 3, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 2', response.data['error'])
+        response = self.client.delete(self.url, {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+
+    def test_update_and_delete(self):
+        own = ExpenseService.create_expense(self.item(amount=Decimal('10')), self.user)
+        foreign = ExpenseService.create_expense(self.item(amount=Decimal('20')), self.other)
+        before = Expense.objects.get(id=own.id).updated_at
+
+        # Another user's expense is reported as missing and nothing is changed
+        response = self.client.patch(
+            self.url, [{'id': own.id, 'amount': '15.00'}, {'id': foreign.id, 'amount': '1.00'}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], {1: {'id': ['Expense not found.']}})
+        self.assertEqual(Expense.objects.get(id=own.id).amount, Decimal('10.00'))
+
+        response = self.client.patch(
+            self.url, [{'id': own.id, 'amount': '15.00', 'category': 'Travel'}], format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        updated = Expense.objects.get(id=own.id)
+        self.assertEqual((updated.amount, updated.category_normalized), (Decimal('15.00'), 'travel'))
+        self.assertGreater(updated.updated_at, before)
+        self.assertRollupsMatch()
+
+        response = self.client.delete(self.url, {'ids': [own.id, foreign.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(self.url, {'ids': [own.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Expense.objects.values_list('id', flat=True)), [foreign.id])
+        self.assertRollupsMatch()
+
+
+class ExpenseImportTests(TestCase):
+    CSV = (
+        "Title,Amount,Category,Date\n"
+        "Weekly groceries,40.00,Groceries,2025-03-01\n"
+        "Uber to airport,25.50,,2025-03-02\n"
+        "Birthday gift,15.00,,2025-03-03\n"
+        "Broken row,not a number,Food,2025-03-04\n"
+    )
+    OFX = (
+        "<OFX><BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250305120000<TRNAMT>-12.30<NAME>Corner pharmacy</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250306<TRNAMT>500.00<NAME>Salary</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250307<TRNAMT>-900.00<MEMO>March rent</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>\n"
+    )
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+
+    def imported(self):
+        return list(Expense.objects.filter(user=self.user).order_by('date').values_list('title', 'amount', 'category'))
+
+    def test_csv_rows_categories_and_errors(self):
+        batches = []
+        result = ExpenseImportService.run(
+            io.StringIO(self.CSV), self.user, 'csv', batch_size=2, on_batch=lambda r: batches.append(r.last_row)
+        )
+        self.assertEqual((result.rows, result.imported, result.failed, result.last_row), (4, 3, 1, 4))
+        self.assertEqual(batches, [2, 4])
+        self.assertEqual(result.errors[0]['row'], 4)
+        self.assertIn('amount', result.errors[0]['errors'])
+        # Aliases rename categories, title keywords fill in missing ones
+        self.assertEqual(self.imported(), [
+            ('Weekly groceries', Decimal('40.00'), 'Food'),
+            ('Uber to airport', Decimal('25.50'), 'Travel'),
+            ('Birthday gift', Decimal('15.00'), 'Uncategorized'),
+        ])
+        self.assertEqual(ExpenseRollupRepository.find_mismatches([self.user.id]), {})
+
+    def test_ofx_imports_debits_only(self):
+        result = ExpenseImportService.run(io.StringIO(self.OFX), self.user, 'ofx')
+        self.assertEqual((result.imported, result.failed), (2, 0))
+        self.assertEqual(self.imported(), [
+            ('Corner pharmacy', Decimal('12.30'), 'Health'),
+            ('March rent', Decimal('900.00'), 'Rent'),
+        ])
+        self.assertEqual(Expense.objects.get(title='March rent').date, date(2025, 3, 7))
+
+    def test_api_upload(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('expense-import')
+        response = client.post(url, {'file': SimpleUploadedFile('expenses.csv', self.CSV.encode())})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['imported'], response.data['failed']), (3, 1))
+
+        response = client.post(url, {'file': SimpleUploadedFile('expenses.xlsx', b'')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.post(url, {}).status_code, 400)
+
+    def test_malformed_csv(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('expense-import')
+        header = "Title,Amount,Category,Date\n"
+        rows = (
+            "Bad\0byte,1.00,Food,2025-03-01\n"
+            f"\"{'x' * (csv.field_size_limit() + 1)}\",1.00,Food,2025-03-02\n"
+            "Taxi,9.00,Travel,2025-03-03\n"
+        )
+        response = client.post(url, {'file': SimpleUploadedFile('expenses.csv', (header + rows).encode())})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['imported'], response.data['failed']), (1, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(self.imported(), [('Taxi', Decimal('9.00'), 'Travel')])
+
+        self.assertIn('Malformed CSV row', str(response.data['errors'][1]['errors']))
+
+        oversized_header = f"\"{'x' * (csv.field_size_limit() + 1)}\",Amount\n".encode()
+        response = client.post(url, {'file': SimpleUploadedFile('expenses.csv', oversized_header)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_resumes_from_checkpoint(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/expenses.csv'
+        with open(path, 'w') as csv_file:
+            csv_file.write(self.CSV)
+        with open(f'{path}.checkpoint', 'w') as checkpoint:
+            json.dump({'last_row': 2}, checkpoint)
+
+        stdout = io.StringIO()
+        call_command('import_expenses', path, user='regular', resume=True, stdout=stdout, stderr=io.StringIO())
+        self.assertIn('Resuming after row 2.', stdout.getvalue())
+        self.assertEqual([row[0] for row in self.imported()], ['Birthday gift'])
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+
+class AnalyticsCacheTestMixin:
+    def setUp(self):
+        caches['default'].clear()
+        AnalyticsCache.reset_stats()
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+        self.admin = CustomUser.objects.create_user(username='admin', password='secret', role='admin')
+
+    def create_expense(self, amount):
+        return ExpenseService.create_expense(
+            {'title': 'Lunch', 'amount': Decimal(amount), 'category': 'Food', 'date': date.today()}, self.user
+        )
+
+    def test_hit_after_miss(self):
+        self.create_expense('10.00')
+        first = ExpenseService.generate_analytics(self.user)
+        with self.assertNumQueries(0):
+            second = ExpenseService.generate_analytics(self.user)
+        self.assertEqual(first, second)
+        self.assertEqual(AnalyticsCache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_writes_invalidate_user_and_admin_entries(self):
+        expense = self.create_expense('10.00')
+        ExpenseService.generate_analytics(self.user)
+        ExpenseService.generate_analytics(self.admin)
+
+        ExpenseService.update_expense(expense.id, self.admin, {'amount': '25.00'})
+        self.assertEqual(ExpenseService.generate_analytics(self.user)['category_summary'], {'Food': Decimal('25.00')})
+        self.assertEqual(ExpenseService.generate_analytics(self.admin)['category_summary'], {'Food': Decimal('25.00')})
+
+        ExpenseService.delete_expense(expense.id, self.user)
+        self.assertEqual(ExpenseService.generate_analytics(self.user)['category_summary'], {})
+        self.assertEqual(AnalyticsCache.get_stats(), {'hits': 0, 'misses': 5})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LocMemAnalyticsCacheTests(AnalyticsCacheTestMixin, TestCase):
+    pass
+
+
+class FileBasedAnalyticsCacheTests(AnalyticsCacheTestMixin, TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
@@ -1,13 +1,32 @@
 from django.urls import path
 
-from .views import ExpenseAnalyticsView, ExpenseDetailView, ExpenseListCreateView, ExportExpensesView
+from . import async_views
+from .views import (
+    AdminDashboardView, ExpenseAnalyticsView, ExpenseBulkView, ExpenseChangesView, ExpenseDetailView,
+    ExpenseImportView, ExpenseListCreateView, ExpenseTimeSeriesView, ExportExpensesView, ExportJobDetailView,
+    ExportJobDownloadView, ExportJobListView,
+)
 
 urlpatterns = [
     path('expenses/', ExpenseListCreateView.as_view(), name='expense-list-create'),
+    path('expenses/changes/', ExpenseChangesView.as_view(), name='expense-changes'),
+    path('expenses/bulk/', ExpenseBulkView.as_view(), name='expense-bulk'),
     path('expenses/<int:id>/', ExpenseDetailView.as_view(), name='expense-detail'),
     path('expenses/export/', ExportExpensesView.as_view(), name='expense-export'),
+    path('expenses/export/jobs/', ExportJobListView.as_view(), name='export-job-list'),
+    path('expenses/export/jobs/<int:id>/', ExportJobDetailView.as_view(), name='export-job-detail'),
+    path('expenses/export/jobs/<int:id>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
+    path('expenses/import/', ExpenseImportView.as_view(), name='expense-import'),
 
     path('analytics/', ExpenseAnalyticsView.as_view(), name='expense-analytics'),
+    path('analytics/timeseries/', ExpenseTimeSeriesView.as_view(), name='expense-timeseries'),
+    path('analytics/admin/', AdminDashboardView.as_view(), name='admin-dashboard'),
+
+    # Async variants of the read-heavy endpoints, for ASGI deployments
+    path('async/expenses/', async_views.expense_list, name='async-expense-list-create'),
+    path('async/expenses/<int:id>/', async_views.expense_detail, name='async-expense-detail'),
+    path('async/expenses/export/', async_views.export_expenses, name='async-expense-export'),
+    path('async/analytics/', async_views.expense_analytics, name='async-expense-analytics'),
 ]
 
 
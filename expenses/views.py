@@ -1,14 +1,32 @@
+import io
+import os
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework.generics import ListAPIView
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
 
+from expense_tracker.metrics import profile
+from expenses.conditional import conditional_get
 from expenses.filters.expense import ExpenseFilter
-from expenses.serializers.expense import ExpenseCreateSerializer, ExpenseSerializer
+from expenses.pagination import ExpenseKeysetPagination, ExpensePageNumberPagination
+from expenses.models import ExportJob
+from expenses.serializers.expense import (
+    ExpenseBulkUpdateSerializer, ExpenseCreateSerializer, ExpenseReadSerializer, ExpenseSerializer,
+)
+from expenses.serializers.export_job import ExportJobSerializer
+from expenses.services.dashboard import AdminDashboardService
 from expenses.services.expense import ExpenseService
+from expenses.services.export_job import ExportJobService
+from expenses.services.exporters import CsvExporter, ExporterRegistry
+from expenses.services.importer import ExpenseImportService
+from expenses.services.sync import ExpenseSyncService, SyncTokenExpired
+from expenses.services.timeseries import TimeSeriesService
 
 
 class ExpenseListCreateView(ListAPIView):
@@ -17,6 +35,22 @@ class ExpenseListCreateView(ListAPIView):
     serializer_class = ExpenseSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ExpenseFilter
+    pagination_classes = {
+        'page': ExpensePageNumberPagination,
+        'cursor': ExpenseKeysetPagination,
+    }
+
+    @property
+    def paginator(self):
+        """
+        Pick page number or keyset pagination from the request.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            mode = params.get('pagination') or ('cursor' if 'cursor' in params else settings.EXPENSE_LIST_PAGINATION)
+            pagination_class = self.pagination_classes.get(mode, self.pagination_classes['page'])
+            self._paginator = pagination_class()
+        return self._paginator
 
     def get_queryset(self):
         return ExpenseService.get_expenses(self.request.user)
@@ -25,6 +59,27 @@ class ExpenseListCreateView(ListAPIView):
         # Pass the request to the serializer context
         return {'request': self.request}
 
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List expenses through the values()-based read serializer.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = ExpenseReadSerializer(request)
+        rows = queryset.values(*serializer.source_fields)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with profile('serialize'):
+                data = serializer.serialize_many(page)
+            return self.get_paginated_response(data)
+        with profile('serialize'):
+            data = serializer.serialize_many(rows)
+        return Response(data)
+
     def post(self, request):
         serializer = ExpenseCreateSerializer(data=request.data)
         if serializer.is_valid():
@@ -32,16 +87,40 @@ class ExpenseListCreateView(ListAPIView):
             return Response(ExpenseCreateSerializer(expense, context={'request': request}).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ExpenseChangesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Expenses created, updated or deleted since ?since=<sync token>, in change order.
+        Clients apply the changes, then call again with next_token while has_more is true.
+        """
+        page_size = ExpenseKeysetPagination().get_page_size(request.query_params)
+        serializer = ExpenseReadSerializer(request)
+        try:
+            with profile('serialize'):
+                changes = ExpenseSyncService.get_changes(
+                    request.user, request.query_params.get('since'), page_size, serializer
+                )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except SyncTokenExpired as e:
+            return Response({"error": str(e)}, status=status.HTTP_410_GONE)
+        return Response(changes)
+
+
 class ExpenseDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get
     def get(self, request, id):
         """
         Retrieve an expense by ID.
         """
         expense = ExpenseService.get_expense(id, request.user)
-        serializer = ExpenseSerializer(expense, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with profile('serialize'):
+            data = ExpenseSerializer(expense, context={'request': request}).data
+        return Response(data, status=status.HTTP_200_OK)
 
     def patch(self, request, id):
         """
@@ -58,28 +137,158 @@ class ExpenseDetailView(APIView):
         response_message = ExpenseService.delete_expense(id, request.user)
         return Response(response_message, status=status.HTTP_204_NO_CONTENT)
 
+class ExpenseBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def validate_size(items):
+        """
+        Check that the payload is a list within the bulk size limit.
+        """
+        if not isinstance(items, list):
+            raise ValueError("Expected a list of items.")
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValueError(f"At most {settings.BULK_MAX_ITEMS} items are allowed per request.")
+
+    @staticmethod
+    def get_missing_errors(ids, expenses):
+        """
+        Report the items whose expense does not exist or is not accessible, keyed by position.
+        """
+        return {
+            index: {"id": ["Expense not found."]}
+            for index, expense_id in enumerate(ids)
+            if expense_id not in expenses
+        }
+
+    def post(self, request):
+        """
+        Create many expenses. Nothing is written unless every item is valid.
+        """
+        try:
+            self.validate_size(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ExpenseCreateSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        expenses = ExpenseService.bulk_create_expenses(serializer.validated_data, request.user)
+        return Response(ExpenseCreateSerializer(expenses, many=True).data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        """
+        Partially update many expenses, each item identified by its "id".
+        """
+        try:
+            self.validate_size(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ExpenseBulkUpdateSerializer(data=request.data, many=True, partial=True)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = [item['id'] for item in serializer.validated_data]
+        expenses = ExpenseService.get_expenses_by_ids(ids, request.user)
+        errors = ExpenseBulkView.get_missing_errors(ids, expenses)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = {}
+        for item in serializer.validated_data:
+            expense_id = item.pop('id')
+            changes.setdefault(expense_id, {}).update(item)
+        updated = ExpenseService.bulk_update_expenses(list(expenses.values()), changes)
+        serializer = ExpenseSerializer(updated, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        """
+        Delete many expenses given as {"ids": [...]}.
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        try:
+            self.validate_size(ids)
+            ids = [int(expense_id) for expense_id in ids]
+        except (TypeError, ValueError):
+            return Response({"error": "Expected a list of expense IDs in \"ids\"."}, status=status.HTTP_400_BAD_REQUEST)
+
+        expenses = ExpenseService.get_expenses_by_ids(ids, request.user)
+        errors = ExpenseBulkView.get_missing_errors(ids, expenses)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        response_message = ExpenseService.bulk_delete_expenses(list(expenses.values()))
+        return Response(response_message, status=status.HTTP_200_OK)
+
+class ExpenseImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """
+        Import expenses from an uploaded CSV or OFX file, streamed in batches.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+
+        try:
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = ExpenseImportService.run(lines, request.user, file_format)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
 class ExportExpensesView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @staticmethod
+    def use_streaming(request):
+        """
+        Decide between a streamed and a buffered export.
+        """
+        stream = request.query_params.get('stream')
+        if stream is None:
+            return settings.EXPORT_STREAMING
+        return stream.lower() in ('1', 'true', 'yes')
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= names the export format here, not a DRF renderer
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request):
         # Get query parameters
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
         try:
-            # Validate the date range
+            # Validate the date range and pick the exporter
             ExpenseService.validate_date_range(start_date, end_date)
+            exporter = ExporterRegistry.get_exporter(request.query_params.get('format'))
 
             # Fetch expenses
             admin = request.user.role == 'admin'
             expenses = ExpenseService.get_expenses_for_export(start_date, end_date, request.user, admin)
 
-            # Generate the CSV content
-            csv_content = ExpenseService.generate_csv(expenses, include_user=admin)
+            if self.use_streaming(request):
+                # Stream the export so memory stays flat and the first rows go out immediately
+                response = StreamingHttpResponse(
+                    exporter.stream(expenses, include_user=admin), content_type=exporter.content_type
+                )
+            elif exporter is CsvExporter:
+                # Generate the CSV content
+                csv_content = ExpenseService.generate_csv(expenses, include_user=admin)
 
-            # Create the HTTP response with the CSV file
-            response = HttpResponse(csv_content, content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="expenses_{start_date}_to_{end_date}.csv"'
+                # Create the HTTP response with the CSV file
+                response = HttpResponse(csv_content, content_type='text/csv')
+            else:
+                response = HttpResponse(exporter.stream(expenses, include_user=admin), content_type=exporter.content_type)
+            response['Content-Disposition'] = (
+                f'attachment; filename="expenses_{start_date}_to_{end_date}.{exporter.extension}"'
+            )
 
             return response
 
@@ -88,12 +297,90 @@ class ExportExpensesView(APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+class ExportJobListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Queue a CSV export to be written in the background.
+        Returns the job in progress for an identical request instead of starting another.
+        """
+        try:
+            job, created = ExportJobService.request_export(
+                request.data.get('start_date'), request.data.get('end_date'), request.user
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ExportJobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+class ExportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        """
+        Report the status of an export job.
+        """
+        job = ExportJobService.get_job(id, request.user)
+        serializer = ExportJobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class ExportJobDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        """
+        Download the file of a finished export job.
+        """
+        job = ExportJobService.get_job(id, request.user)
+        if job.status != ExportJob.DONE:
+            return Response({"error": f"Export job is {job.status}."}, status=status.HTTP_409_CONFLICT)
+        try:
+            export_file = open(job.file_path, 'rb')
+        except FileNotFoundError:
+            return Response({"error": "Export file no longer exists."}, status=status.HTTP_410_GONE)
+        return FileResponse(
+            export_file, as_attachment=True, content_type='text/csv',
+            filename=f'expenses_{job.start_date}_to_{job.end_date}.csv',
+        )
+
 class ExpenseAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(daily=True)
     def get(self, request):
         try:
             analytics = ExpenseService.generate_analytics(request.user)
             return Response(analytics)
         except Exception as e:
-            return Response({"error": str(e)}, status=500)
\ No newline at end of file
+            return Response({"error": str(e)}, status=500)
+
+
+class ExpenseTimeSeriesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Spending per day, week, month or quarter between ?start= and ?end=, with
+        ?by_category=true adding a per-category breakdown.
+        """
+        params = request.query_params
+        try:
+            start, end, granularity = TimeSeriesService.parse_params(params)
+            by_category = params.get('by_category', '').lower() in ('1', 'true', 'yes')
+            series = TimeSeriesService.get_time_series(request.user, start, end, granularity, by_category)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(series)
+
+
+class AdminDashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Spending across all users by category, month and user, with the largest expenses. Admins only.
+        """
+        if request.user.role != 'admin':
+            return Response({"error": "Only admins can read the dashboards."}, status=status.HTTP_403_FORBIDDEN)
+        return Response(AdminDashboardService.get_dashboard())
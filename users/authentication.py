@@ -0,0 +1,45 @@
+from django.core.exceptions import ValidationError
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import CustomUser
+from users.services.cache import UserCache
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the token claims instead of a query.
+    Tokens without claims, or issued before the user was last updated in this
+    process, fall back to the cached user record. The active flag always comes from
+    that record, reloaded at least every USER_CACHE_TTL seconds, so a deactivated
+    user is rejected without waiting for their access token to expire.
+    """
+    CLAIM_FIELDS = ('username', 'role')
+
+    def get_user(self, validated_token):
+        try:
+            # The claim holds the ID as a string
+            user_id = CustomUser._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = UserCache.get(user_id)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+        claims_at = validated_token.get('claims_at')
+        if claims_at is not None and not UserCache.changed_since(user_id, claims_at):
+            return self.get_claims_user(user_id, validated_token)
+        return user
+
+    def get_claims_user(self, user_id, validated_token):
+        """
+        Return a CustomUser with only the id and claim fields loaded.
+        Any other field is deferred and loads from the database on first access,
+        and save() only writes the loaded fields.
+        """
+        field_names = ['id', *self.CLAIM_FIELDS]
+        values = [user_id, *(validated_token[field] for field in self.CLAIM_FIELDS)]
+        return CustomUser.from_db(router.db_for_read(CustomUser), field_names, values)
@@ -0,0 +1,65 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.models import CustomUser
+
+
+class UserCache:
+    """
+    Short-lived in-process cache of user records for authentication.
+    Entries expire after USER_CACHE_TTL seconds and are dropped, in this process,
+    whenever UserService updates the user. The time of that update is kept so that
+    token claims issued before it are no longer trusted.
+    """
+    _lock = threading.Lock()
+    _users = {}
+    _changed_at = {}
+
+    @staticmethod
+    def get(user_id):
+        """
+        Return a copy of the user's record, loading it on a miss or after expiry.
+        """
+        now = time.monotonic()
+        with UserCache._lock:
+            entry = UserCache._users.get(user_id)
+        if entry is None or entry[0] <= now:
+            try:
+                user = CustomUser.objects.get(id=user_id)
+            except CustomUser.DoesNotExist:
+                raise AuthenticationFailed("User not found", code='user_not_found')
+            entry = (now + settings.USER_CACHE_TTL, user)
+            with UserCache._lock:
+                UserCache._users[user_id] = entry
+        # Callers may modify their user; the cached record must stay untouched
+        return copy.copy(entry[1])
+
+    @staticmethod
+    def invalidate(user_id):
+        now = time.time()
+        with UserCache._lock:
+            UserCache._users.pop(user_id, None)
+            UserCache._changed_at[user_id] = now
+            # Claims older than the refresh token lifetime are rejected anyway
+            horizon = now - settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+            for stale_id in [key for key, changed in UserCache._changed_at.items() if changed < horizon]:
+                del UserCache._changed_at[stale_id]
+
+    @staticmethod
+    def changed_since(user_id, timestamp):
+        """
+        Tell whether the user was updated in this process at or after the given epoch time.
+        """
+        with UserCache._lock:
+            changed = UserCache._changed_at.get(user_id)
+        return changed is not None and changed >= timestamp
+
+    @staticmethod
+    def clear():
+        with UserCache._lock:
+            UserCache._users.clear()
+            UserCache._changed_at.clear()
@@ -1,4 +1,5 @@
 from users.repositories.user import UserRepository
+from users.services.cache import UserCache
 
 
 class UserService:
@@ -15,4 +16,7 @@ class UserService:
         Update a user's profile.
         """
         user = UserRepository.get_user_by_id(user_id)
-        return UserRepository.update_user(user, data)
+        user = UserRepository.update_user(user, data)
+        # Drop the cached record and stop trusting the claims of earlier tokens
+        UserCache.invalidate(user.id)
+        return user
@@ -1,3 +1,52 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from users.models import CustomUser
+from users.services.cache import UserCache
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        UserCache.clear()
+        self.user = CustomUser.objects.create_user(username='regular', password='secret')
+        self.admin = CustomUser.objects.create_user(username='admin', password='secret', role='admin')
+        self.client = APIClient()
+
+    def login(self, username):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': username, 'password': 'secret'})
+        return response.data
+
+    def get_expenses(self, access, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get(reverse('expense-list-create'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_claims_skip_the_user_query(self):
+        access = self.login('regular')['access']
+        # Only the COUNT runs: there are no expenses to select and no user to load
+        self.assertEqual(self.get_expenses(access, 1).status_code, 200)
+
+    def test_profile_update_stops_trusting_old_claims(self):
+        tokens = self.login('regular')
+        admin_access = self.login('admin')['access']
+        response = self.client.patch(
+            reverse('user-profile-update'), {'user_id': self.user.id, 'role': 'admin'},
+            format='json', HTTP_AUTHORIZATION=f'Bearer {admin_access}',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # The old token's role claim is stale, so the user is loaded once and then cached
+        self.get_expenses(tokens['access'], 2)
+        self.get_expenses(tokens['access'], 1)
+
+        # Refreshing mints a token with the new role
+        access = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}).data['access']
+        self.assertEqual(AccessToken(access)['role'], 'admin')
+        self.get_expenses(access, 1)
+
+    @override_settings(USER_CACHE_TTL=0)
+    def test_deactivated_user_is_rejected_despite_claims(self):
+        access = self.login('regular')['access']
+        CustomUser.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.get_expenses(access, 1).status_code, 401)
@@ -0,0 +1,36 @@
+import time
+
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import CustomUser
+from users.services.cache import UserCache
+
+
+def add_user_claims(token, user):
+    """
+    Copy what authentication needs about the user into the token, so requests
+    can be authenticated without loading the user.
+    """
+    token['username'] = user.username
+    token['role'] = user.role
+    token['claims_at'] = time.time()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user claims. Every access token minted from it gets
+    the user's current claims, so a role change shows up at the next refresh.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_user_claims(token, user)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user_id = CustomUser._meta.pk.to_python(self[api_settings.USER_ID_CLAIM])
+        add_user_claims(access, UserCache.get(user_id))
+        return access